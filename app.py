@@ -3,6 +3,8 @@ Render 배포용 메인 진입점
 main.py의 모든 기능을 Flask 앱으로 통합
 """
 import os
+import hmac
+import time
 import logging
 from flask import Flask, request
 
@@ -11,13 +13,27 @@ app = Flask(__name__)
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 
+# main.py import 허용 시간(초). 넘으면 콜드 스타트가 느려진 것으로 보고 경고합니다.
+# (어떤 모듈이 느린지는 `python -X importtime app.py`로 확인)
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", "3"))
+
+# /warmup 호출 시 X-Warmup-Secret 헤더로 받아야 하는 공유 비밀 값 (설정하지 않으면 /warmup 비활성화)
+WARMUP_SECRET = os.environ.get("WARMUP_SECRET", "")
+
 # main.py를 import하여 Slack 앱 초기화
 # main.py에서 tasks_v2와 functions_framework는 선택적으로 처리됨
 handler = None
 try:
     logging.info("Attempting to import main.py...")
+    import_started = time.perf_counter()
     import main
-    logging.info("main.py imported successfully")
+    import_elapsed = time.perf_counter() - import_started
+    logging.info(f"main.py imported successfully ({import_elapsed:.2f}s)")
+    if import_elapsed > IMPORT_TIME_BUDGET:
+        logging.warning(
+            f"main.py import took {import_elapsed:.2f}s, over the {IMPORT_TIME_BUDGET:.1f}s budget "
+            f"(IMPORT_TIME_BUDGET). Check new module-level imports."
+        )
     
     # main.py의 handler를 사용
     if hasattr(main, 'handler'):
@@ -90,6 +106,22 @@ def worker_endpoint():
         return result
     return (result, 200)
 
+@app.route('/warmup', methods=['POST'])
+def warmup_endpoint():
+    """워밍업 엔드포인트 (배포 직후 호출하면 Google 클라이언트와 캐시를 미리 준비)
+
+    외부에서 반복 호출해 Google API 할당량을 쓰지 못하도록 X-Warmup-Secret 헤더가 WARMUP_SECRET과 같아야 합니다.
+    """
+    if not WARMUP_SECRET:
+        logging.warning("/warmup called but WARMUP_SECRET is not set; rejecting")
+        return {"status": "disabled"}, 403
+    provided = request.headers.get("X-Warmup-Secret", "")
+    if not hmac.compare_digest(provided.encode(), WARMUP_SECRET.encode()):
+        return {"status": "forbidden"}, 403
+
+    import worker_main
+    return {"status": "ok", "steps": worker_main.warm_up()}, 200
+
 @app.route('/tmap', methods=['GET'])
 def tmap_redirect():
     """T-map 앱 리다이렉트 핸들러"""
@@ -147,5 +179,7 @@ if handler is None:
     logging.error("Please check the logs above for import errors.")
 
 if __name__ == '__main__':
+    import worker_main
+    worker_main.start_boot_warm_up()
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
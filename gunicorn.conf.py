@@ -0,0 +1,69 @@
+# gunicorn.conf.py (Render 운영 서버 설정: gunicorn -c gunicorn.conf.py app:app)
+
+import os
+import logging
+
+# ----------------------------------------------------
+# 1. 서버 / 워커 설정
+# ----------------------------------------------------
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+
+# Slack 요청과 /worker 처리는 대부분 외부 API 대기(I/O)라서 프로세스보다 스레드를 늘립니다.
+# 출근 시간대 요청이 한 요청 뒤에 줄 서지 않도록 워커 수 × 스레드 수만큼 동시에 처리합니다.
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+
+# 출근 처리(캘린더/날씨/길찾기)가 길어질 수 있어 기본값(30초)보다 여유를 둡니다.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+# 종료 신호 후 처리 중인 요청과 작업 큐를 마무리할 시간(초)
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# main.py(Slack 앱, Google 라이브러리) import를 마스터에서 한 번만 하고 워커는 fork로 공유합니다.
+# Google API 클라이언트, SQLite 연결, 작업 큐는 프로세스(pid)별로 새로 만들어지므로 fork 후에도 안전합니다.
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+# ----------------------------------------------------
+# 2. 워커 수명 주기 훅
+# ----------------------------------------------------
+def post_worker_init(worker):
+    """워커 기동 직후 작업 큐를 시작하고 (재시작 전에 남은 작업을 바로 이어서 처리),
+    WARMUP_ON_BOOT가 켜져 있으면 워밍업을 백그라운드로 실행합니다."""
+    try:
+        import main
+        import job_queue
+        import worker_main
+        if main.WORKER_DISPATCH_MODE == "queue":
+            job_queue.start(worker_main.process_task)
+    except Exception as e:
+        # 여기서 실패해도 첫 출퇴근 요청 때 다시 시작을 시도함
+        logging.error(f"[gunicorn] 작업 큐 시작 실패 (pid {worker.pid}): {e}")
+
+    try:
+        import worker_main
+        worker_main.start_boot_warm_up()
+    except Exception as e:
+        logging.error(f"[gunicorn] 워밍업 시작 실패 (pid {worker.pid}): {e}")
+
+
+def worker_exit(server, worker):
+    """워커 종료 시 처리 중인 작업을 마무리하고 모아 둔 시트 기록을 전송합니다."""
+    try:
+        import job_queue
+        # 남은 종료 유예 시간 안에서 기다림 (시트 전송 시간 몇 초를 남겨 둠)
+        if not job_queue.drain(max(1, graceful_timeout - 5)):
+            server.log.warning(f"[gunicorn] 워커 {worker.pid}: 종료 시 끝나지 않은 작업이 있음")
+    except Exception as e:
+        server.log.error(f"[gunicorn] 워커 {worker.pid}: 작업 큐 정리 실패: {e}")
+
+    try:
+        import sheets_handler
+        sheets_handler.flush_appends()
+    except Exception as e:
+        server.log.error(f"[gunicorn] 워커 {worker.pid}: 시트 기록 전송 실패: {e}")
@@ -0,0 +1,260 @@
+# job_queue.py (백그라운드 작업 큐: 메모리 또는 로컬 SQLite)
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+
+import local_store
+
+# 작업 스레드 수 / 대기열 최대 크기 / 실패 시 재시도 횟수
+JOB_QUEUE_WORKERS = int(os.environ.get("JOB_QUEUE_WORKERS", "4"))
+JOB_QUEUE_MAX_SIZE = int(os.environ.get("JOB_QUEUE_MAX_SIZE", "200"))
+JOB_QUEUE_MAX_RETRIES = int(os.environ.get("JOB_QUEUE_MAX_RETRIES", "3"))
+# 재시도 대기 시간(초) = JOB_QUEUE_RETRY_BACKOFF * 2^(시도 횟수-1)
+JOB_QUEUE_RETRY_BACKOFF = float(os.environ.get("JOB_QUEUE_RETRY_BACKOFF", "2"))
+# 큐 저장 방식: sqlite(로컬 DB, LOCAL_DB_PATH가 영구 디스크에 있으면 재시작해도 작업 유지) | memory(프로세스 메모리)
+JOB_QUEUE_BACKEND = os.environ.get("JOB_QUEUE_BACKEND", "sqlite").lower()
+# sqlite: 가져간 작업이 이 시간(초) 안에 끝나지 않으면(프로세스 종료 등) 다시 처리 대상이 됨
+JOB_VISIBILITY_TIMEOUT = float(os.environ.get("JOB_VISIBILITY_TIMEOUT", "300"))
+# sqlite: 새 작업이 없을 때 DB를 다시 확인하는 간격(초)
+JOB_QUEUE_POLL_INTERVAL = float(os.environ.get("JOB_QUEUE_POLL_INTERVAL", "1"))
+
+if JOB_VISIBILITY_TIMEOUT < local_store.IDEMPOTENCY_STALE_SECONDS:
+    logging.getLogger(__name__).warning(
+        f"[job_queue] JOB_VISIBILITY_TIMEOUT({JOB_VISIBILITY_TIMEOUT}초)이 IDEMPOTENCY_STALE_SECONDS"
+        f"({local_store.IDEMPOTENCY_STALE_SECONDS}초)보다 짧아 중단된 작업의 재처리가 늦어질 수 있음"
+    )
+
+
+class JobDeferred(Exception):
+    """지금은 처리할 수 없어 retry_after초 후 다시 시도할 작업. 시도 횟수에 포함하지 않습니다."""
+
+    def __init__(self, message: str = "", retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = max(0.0, retry_after)
+
+
+# ----------------------------------------------------
+# 1. 큐 상태 (프로세스 공용)
+# ----------------------------------------------------
+# 대기열 항목: (payload, attempt)  /  None은 작업 스레드 종료 신호
+_jobs = queue.Queue(maxsize=JOB_QUEUE_MAX_SIZE)
+_handler = None
+_threads = []
+_pid = None
+_state_lock = threading.Lock()
+_pending_retries = set()  # 재시도 대기 중인 threading.Timer
+_stop = threading.Event()  # sqlite: 작업 스레드 종료 신호
+_wakeup = threading.Event()  # sqlite: 같은 프로세스에서 새 작업이 들어왔음을 알림
+
+
+def start(handler):
+    """작업 스레드를 시작합니다. 이미 시작됐으면 아무것도 하지 않습니다 (fork 이후에는 다시 시작).
+
+    Args:
+        handler: payload(dict)를 받아 처리하는 함수. 실패 시 예외를 올리면 재시도합니다.
+    """
+    global _handler, _threads, _pid, _jobs
+    with _state_lock:
+        if _threads and _pid == os.getpid():
+            return
+        if _pid is not None and _pid != os.getpid():
+            # fork 전 부모 프로세스의 대기열/스레드는 자식에서 쓸 수 없음
+            _jobs = queue.Queue(maxsize=JOB_QUEUE_MAX_SIZE)
+            _pending_retries.clear()
+
+        if _pid is None:
+            atexit.register(drain)  # 종료 시 남은 작업 처리
+        _handler = handler
+        _pid = os.getpid()
+        _threads = []
+        _stop.clear()
+        target = _sqlite_worker_loop if JOB_QUEUE_BACKEND == "sqlite" else _memory_worker_loop
+        for index in range(JOB_QUEUE_WORKERS):
+            thread = threading.Thread(target=target, name=f"job-queue-{index}", daemon=True)
+            thread.start()
+            _threads.append(thread)
+        logging.info(
+            f"[job_queue] 작업 스레드 {JOB_QUEUE_WORKERS}개 시작 "
+            f"(저장 방식 {JOB_QUEUE_BACKEND}, 최대 대기 {JOB_QUEUE_MAX_SIZE}건)"
+        )
+
+
+def is_running() -> bool:
+    return bool(_threads) and _pid == os.getpid()
+
+
+def enqueue(payload: dict) -> bool:
+    """작업을 대기열(메모리 또는 로컬 DB)에 넣고 바로 반환합니다.
+
+    Returns:
+        bool: 대기열에 들어갔으면 True, 큐가 시작되지 않았거나 가득 찼으면 False
+    """
+    if not is_running():
+        return False
+
+    if JOB_QUEUE_BACKEND == "sqlite":
+        try:
+            if local_store.count_jobs() >= JOB_QUEUE_MAX_SIZE:
+                logging.warning(f"[job_queue] 대기열 가득 참 ({JOB_QUEUE_MAX_SIZE}건), 작업 거부: {payload.get('action')}")
+                return False
+            local_store.enqueue_job(json.dumps(payload, ensure_ascii=False))
+        except Exception as e:
+            logging.error(f"[job_queue] 작업 저장 실패: {payload.get('action')} - {e}")
+            return False
+        _wakeup.set()
+        return True
+
+    try:
+        _jobs.put_nowait((payload, 1))
+        return True
+    except queue.Full:
+        logging.warning(f"[job_queue] 대기열 가득 참 ({JOB_QUEUE_MAX_SIZE}건), 작업 거부: {payload.get('action')}")
+        return False
+
+
+def _schedule_retry(payload: dict, attempt: int, delay: float = None, deferred: bool = False):
+    """backoff(또는 delay초) 후 작업을 attempt+1번째 시도로 다시 대기열에 넣습니다. (작업 스레드를 sleep으로 붙잡지 않음)
+
+    deferred: JobDeferred로 보류된 작업. drain()은 기다리지 않습니다 (다른 곳에서 처리 중인 작업이라 당겨도 다시 보류됨).
+    """
+    if delay is None:
+        delay = JOB_QUEUE_RETRY_BACKOFF * (2 ** (attempt - 1))
+
+    def _requeue():
+        with _state_lock:
+            if timer not in _pending_retries:
+                return  # 이미 drain()에서 넣었음
+            _pending_retries.discard(timer)
+        try:
+            _jobs.put_nowait((payload, attempt + 1))
+        except queue.Full:
+            logging.error(f"[job_queue] 재시도 대기열 가득 참, 작업 포기: {payload.get('action')}")
+
+    timer = threading.Timer(delay, _requeue)
+    timer.daemon = True
+    timer.deferred = deferred
+    with _state_lock:
+        _pending_retries.add(timer)
+    timer.start()
+
+
+def _memory_worker_loop():
+    while True:
+        item = _jobs.get()
+        try:
+            if item is None:
+                return
+            payload, attempt = item
+            try:
+                _handler(payload)
+            except JobDeferred as e:
+                logging.info(f"[job_queue] 작업 보류, {e.retry_after:.0f}초 후 다시 시도: {payload.get('action')} - {e}")
+                _schedule_retry(payload, attempt - 1, delay=e.retry_after, deferred=True)
+            except Exception as e:
+                if attempt <= JOB_QUEUE_MAX_RETRIES:
+                    logging.warning(f"[job_queue] 작업 실패 (시도 {attempt}), 재시도 예정: {payload.get('action')} - {e}")
+                    _schedule_retry(payload, attempt)
+                else:
+                    logging.exception(f"[job_queue] 작업 최종 실패: {payload.get('action')} - {e}")
+        finally:
+            _jobs.task_done()
+
+
+def _sqlite_worker_loop():
+    while not _stop.is_set():
+        try:
+            job = local_store.claim_job(JOB_VISIBILITY_TIMEOUT)
+        except Exception as e:
+            logging.error(f"[job_queue] 작업 조회 실패: {e}")
+            job = None
+        if job is None:
+            _wakeup.wait(JOB_QUEUE_POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+
+        job_id, raw_payload, attempt = job
+        try:
+            payload = json.loads(raw_payload)
+            _handler(payload)
+            local_store.complete_job(job_id)
+        except JobDeferred as e:
+            logging.info(f"[job_queue] 작업 {job_id} 보류, {e.retry_after:.0f}초 후 다시 시도: {e}")
+            try:
+                local_store.defer_job(job_id, e.retry_after)
+            except Exception as store_error:
+                logging.error(f"[job_queue] 작업 {job_id} 상태 저장 실패: {store_error}")
+        except Exception as e:
+            try:
+                if attempt <= JOB_QUEUE_MAX_RETRIES:
+                    delay = JOB_QUEUE_RETRY_BACKOFF * (2 ** (attempt - 1))
+                    logging.warning(f"[job_queue] 작업 {job_id} 실패 (시도 {attempt}), {delay}초 후 재시도: {e}")
+                    local_store.retry_job(job_id, delay, str(e))
+                else:
+                    logging.exception(f"[job_queue] 작업 {job_id} 최종 실패, dead-letter로 이동: {e}")
+                    local_store.dead_letter_job(job_id, str(e))
+            except Exception as store_error:
+                # 상태 저장에 실패해도 가시성 타임아웃 후 다시 처리됨
+                logging.error(f"[job_queue] 작업 {job_id} 상태 저장 실패: {store_error}")
+
+
+def drain(timeout: float = 30.0) -> bool:
+    """작업 스레드를 멈춥니다 (종료 시 호출).
+
+    memory: 대기 중인 작업을 모두 처리한 뒤 멈춥니다.
+    sqlite: 처리 중인 작업만 끝내고 멈춥니다. 대기 중인 작업은 DB에 남습니다.
+
+    Returns:
+        bool: 제한 시간 안에 모두 처리했으면 True
+    """
+    global _threads
+    if not is_running():
+        return True
+
+    deadline = time.monotonic() + timeout
+    if JOB_QUEUE_BACKEND == "sqlite":
+        # 처리 중인 작업만 끝내고 멈춤. 남은 작업은 DB에 남아 다음 기동 시 처리됨
+        _stop.set()
+        _wakeup.set()
+        for thread in _threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        finished = not any(thread.is_alive() for thread in _threads)
+        _threads = []
+        if not finished:
+            logging.error("[job_queue] 종료 시 처리 중인 작업이 끝나지 않음 (가시성 타임아웃 후 재처리)")
+        return finished
+
+    def _retry_timers():
+        with _state_lock:
+            return [timer for timer in _pending_retries if not timer.deferred]
+
+    while time.monotonic() < deadline:
+        # 재시도 대기 중인 작업은 backoff를 기다리지 않고 바로 대기열에 넣음
+        for timer in _retry_timers():
+            timer.cancel()
+            timer.function()
+        if not _jobs.unfinished_tasks and not _retry_timers():
+            break
+        time.sleep(0.05)
+    finished = not _jobs.unfinished_tasks and not _retry_timers()
+    with _state_lock:
+        deferred = sum(1 for timer in _pending_retries if timer.deferred)
+    if deferred:
+        logging.warning(f"[job_queue] 다른 곳에서 처리 중이라 보류된 작업 {deferred}건은 기다리지 않음")
+
+    for _ in _threads:
+        try:
+            _jobs.put_nowait(None)
+        except queue.Full:
+            break
+    for thread in _threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    _threads = []
+
+    if not finished:
+        logging.error(f"[job_queue] 종료 시 처리하지 못한 작업 {_jobs.qsize()}건")
+    return finished
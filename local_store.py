@@ -0,0 +1,344 @@
+# local_store.py (프로세스 간 공유하는 로컬 SQLite 저장소)
+
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+
+# 재시작/재배포 후에도 남아야 하는 로컬 데이터(작업 큐, 중복 방지 키, 캐시, 전송 대기 기록)의 기본 디렉터리
+# 운영에서는 영구 디스크 경로(예: Render Disk /var/data)로 설정합니다. 기본값(임시 디렉터리)은 재배포 시 사라집니다.
+LOCAL_DATA_DIR = os.environ.get("LOCAL_DATA_DIR", tempfile.gettempdir())
+# 같은 호스트의 모든 프로세스(웹/워커)가 함께 쓰는 SQLite 파일 경로
+LOCAL_DB_PATH = os.environ.get("LOCAL_DB_PATH", os.path.join(LOCAL_DATA_DIR, "attendance_bot.sqlite3"))
+# 'running' 상태로 이 시간(초)이 지난 키는 처리 중 죽은 것으로 보고 다시 가져갈 수 있습니다.
+# 작업 큐의 가시성 타임아웃(JOB_VISIBILITY_TIMEOUT)보다 길지 않게 둡니다. (다시 전달된 작업이 키를 가져갈 수 있도록)
+IDEMPOTENCY_STALE_SECONDS = float(os.environ.get("IDEMPOTENCY_STALE_SECONDS", "300"))
+# 이 시간(초)보다 오래된 키는 정리합니다.
+IDEMPOTENCY_RETENTION_SECONDS = 3 * 24 * 3600
+# 길찾기 소요시간은 15분 출발 구간 단위라 하루 지난 결과는 정리합니다.
+TRAVEL_TIME_RETENTION_SECONDS = 24 * 3600
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        payload TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL,
+        created_at REAL NOT NULL,
+        last_error TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_jobs_available_at ON jobs (available_at)",
+    """
+    CREATE TABLE IF NOT EXISTS dead_jobs (
+        id INTEGER PRIMARY KEY,
+        payload TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        failed_at REAL NOT NULL,
+        last_error TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS travel_time_cache (
+        key TEXT PRIMARY KEY,
+        result TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS geocode_cache (
+        address TEXT PRIMARY KEY,
+        lng REAL,
+        lat REAL,
+        updated_at REAL NOT NULL
+    )
+    """,
+]
+
+# ----------------------------------------------------
+# 1. 연결 관리 (스레드별 연결, WAL 모드)
+# ----------------------------------------------------
+_local = threading.local()
+
+
+def is_ephemeral_path(path: str) -> bool:
+    """경로가 임시 디렉터리(재시작/재배포 시 사라지는 곳) 아래에 있으면 True를 반환합니다."""
+    resolved = os.path.realpath(path)
+    for temp_dir in {os.path.realpath(tempfile.gettempdir()), "/tmp"}:
+        if resolved == temp_dir or resolved.startswith(temp_dir + os.sep):
+            return True
+    return False
+
+
+def warn_if_ephemeral(path: str, what: str):
+    """경로가 임시 디렉터리 아래에 있으면 재시작 시 데이터가 사라진다고 경고합니다."""
+    if is_ephemeral_path(path):
+        # import 시점에 호출되므로 루트 logging.warning 대신 모듈 로거 사용 (앱의 logging.basicConfig가 무시되지 않도록)
+        logging.getLogger(__name__).warning(
+            f"[local_store] {what} 경로({path})가 임시 디렉터리에 있어 재시작/재배포 시 사라집니다. "
+            f"LOCAL_DATA_DIR을 영구 디스크 경로로 설정하세요."
+        )
+
+
+warn_if_ephemeral(LOCAL_DB_PATH, "로컬 DB(작업 큐, 중복 방지 키, 캐시)")
+
+
+def get_connection() -> sqlite3.Connection:
+    """현재 스레드 전용 SQLite 연결을 반환합니다. fork 이후에는 새로 연결합니다."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+
+    db_dir = os.path.dirname(LOCAL_DB_PATH)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+
+    # isolation_level=None: 문장 단위 자동 커밋 (명시적 BEGIN만 트랜잭션)
+    conn = sqlite3.connect(LOCAL_DB_PATH, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    conn.execute(
+        "DELETE FROM idempotency_keys WHERE updated_at < ?",
+        (time.time() - IDEMPOTENCY_RETENTION_SECONDS,)
+    )
+
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+# ----------------------------------------------------
+# 2. 중복 실행 방지 키
+# ----------------------------------------------------
+def claim_idempotency_key(key: str) -> bool:
+    """작업 키를 선점합니다.
+
+    처음 보는 키이거나, 처리 중('running') 상태로 오래 방치된 키면 True를 반환합니다.
+    이미 완료됐거나 다른 곳에서 처리 중이면 False를 반환합니다.
+    저장소를 쓸 수 없으면 작업을 막지 않도록 True를 반환합니다.
+    """
+    now = time.time()
+    try:
+        conn = get_connection()
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO idempotency_keys (key, status, updated_at) VALUES (?, 'running', ?)",
+            (key, now)
+        )
+        if cur.rowcount == 1:
+            return True
+
+        cur = conn.execute(
+            "UPDATE idempotency_keys SET updated_at = ? "
+            "WHERE key = ? AND status = 'running' AND updated_at < ?",
+            (now, key, now - IDEMPOTENCY_STALE_SECONDS)
+        )
+        return cur.rowcount == 1
+    except sqlite3.Error as e:
+        logging.error(f"[local_store] 중복 실행 방지 키 확인 실패 ({key}): {e}")
+        return True
+
+
+def complete_idempotency_key(key: str):
+    """작업 키를 완료 상태로 바꿉니다. 이후 같은 키는 모두 건너뜁니다."""
+    try:
+        get_connection().execute(
+            "UPDATE idempotency_keys SET status = 'done', updated_at = ? WHERE key = ?",
+            (time.time(), key)
+        )
+    except sqlite3.Error as e:
+        logging.error(f"[local_store] 작업 키 완료 처리 실패 ({key}): {e}")
+
+
+def get_idempotency_key(key: str):
+    """작업 키 상태를 반환합니다.
+
+    Returns:
+        (status, updated_at) 또는 키가 없거나 조회에 실패하면 None. status는 'running' 또는 'done'.
+    """
+    try:
+        row = get_connection().execute(
+            "SELECT status, updated_at FROM idempotency_keys WHERE key = ?",
+            (key,)
+        ).fetchone()
+        return tuple(row) if row else None
+    except sqlite3.Error as e:
+        logging.error(f"[local_store] 작업 키 조회 실패 ({key}): {e}")
+        return None
+
+
+def release_idempotency_key(key: str):
+    """완료되지 않은 작업 키를 놓아 다시 시도할 수 있게 합니다."""
+    try:
+        get_connection().execute(
+            "DELETE FROM idempotency_keys WHERE key = ? AND status = 'running'",
+            (key,)
+        )
+    except sqlite3.Error as e:
+        logging.error(f"[local_store] 작업 키 해제 실패 ({key}): {e}")
+
+
+# ----------------------------------------------------
+# 3. 지오코딩 캐시 (주소 → 좌표)
+# ----------------------------------------------------
+def get_geocode(address: str):
+    """저장된 지오코딩 결과를 반환합니다.
+
+    Returns:
+        (lng, lat, updated_at) 또는 저장된 값이 없으면 None.
+        검색 결과가 없던 주소는 lng, lat가 None입니다.
+    """
+    try:
+        row = get_connection().execute(
+            "SELECT lng, lat, updated_at FROM geocode_cache WHERE address = ?",
+            (address,)
+        ).fetchone()
+        return tuple(row) if row else None
+    except sqlite3.Error as e:
+        logging.error(f"[local_store] 지오코딩 캐시 조회 실패 ({address}): {e}")
+        return None
+
+
+def put_geocode(address: str, lng, lat):
+    """지오코딩 결과를 저장합니다. 검색 결과가 없으면 lng, lat에 None을 넘깁니다."""
+    try:
+        get_connection().execute(
+            "INSERT OR REPLACE INTO geocode_cache (address, lng, lat, updated_at) VALUES (?, ?, ?, ?)",
+            (address, lng, lat, time.time())
+        )
+    except sqlite3.Error as e:
+        logging.error(f"[local_store] 지오코딩 캐시 저장 실패 ({address}): {e}")
+
+
+# ----------------------------------------------------
+# 3-1. 길찾기 소요시간 캐시 (gunicorn 워커 등 여러 프로세스가 공유)
+# ----------------------------------------------------
+def get_travel_time(key: str):
+    """저장된 길찾기 결과(JSON 문자열)를 반환합니다. 없으면 None."""
+    try:
+        row = get_connection().execute(
+            "SELECT result FROM travel_time_cache WHERE key = ?",
+            (key,)
+        ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        logging.error(f"[local_store] 소요시간 캐시 조회 실패 ({key}): {e}")
+        return None
+
+
+def put_travel_time(key: str, result: str):
+    """길찾기 결과(JSON 문자열)를 저장하고 하루 지난 결과를 정리합니다."""
+    now = time.time()
+    try:
+        conn = get_connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO travel_time_cache (key, result, updated_at) VALUES (?, ?, ?)",
+            (key, result, now)
+        )
+        conn.execute(
+            "DELETE FROM travel_time_cache WHERE updated_at < ?",
+            (now - TRAVEL_TIME_RETENTION_SECONDS,)
+        )
+    except sqlite3.Error as e:
+        logging.error(f"[local_store] 소요시간 캐시 저장 실패 ({key}): {e}")
+
+
+# ----------------------------------------------------
+# 4. 작업 큐 (적어도 한 번 전달, 가시성 타임아웃, dead-letter)
+# ----------------------------------------------------
+# 작업을 가져가면 available_at을 (지금 + 가시성 타임아웃)으로 미뤄 둡니다.
+# 처리 중 프로세스가 죽으면 타임아웃 후 다른 작업 스레드가 다시 가져갑니다.
+def enqueue_job(payload: str) -> int:
+    """작업을 저장하고 작업 ID를 반환합니다."""
+    now = time.time()
+    cur = get_connection().execute(
+        "INSERT INTO jobs (payload, available_at, created_at) VALUES (?, ?, ?)",
+        (payload, now, now)
+    )
+    return cur.lastrowid
+
+
+def count_jobs() -> int:
+    """대기 중이거나 처리 중인 작업 수."""
+    return get_connection().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+
+def claim_job(visibility_timeout: float):
+    """처리 가능한 가장 오래된 작업 하나를 가져옵니다.
+
+    Returns:
+        (job_id, payload, attempts) 또는 처리할 작업이 없으면 None. attempts는 이번 시도를 포함합니다.
+    """
+    conn = get_connection()
+    now = time.time()
+    # BEGIN IMMEDIATE: 조회~갱신 사이에 다른 프로세스가 같은 작업을 가져가지 못하도록 쓰기 잠금
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id, payload, attempts FROM jobs WHERE available_at <= ? ORDER BY id LIMIT 1",
+            (now,)
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        job_id, payload, attempts = row
+        conn.execute(
+            "UPDATE jobs SET attempts = attempts + 1, available_at = ? WHERE id = ?",
+            (now + visibility_timeout, job_id)
+        )
+        conn.execute("COMMIT")
+        return job_id, payload, attempts + 1
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def complete_job(job_id: int):
+    """처리가 끝난 작업을 삭제합니다."""
+    get_connection().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+def retry_job(job_id: int, delay: float, error: str):
+    """delay초 후 다시 처리되도록 작업을 돌려 놓습니다."""
+    get_connection().execute(
+        "UPDATE jobs SET available_at = ?, last_error = ? WHERE id = ?",
+        (time.time() + delay, error, job_id)
+    )
+
+
+def defer_job(job_id: int, delay: float):
+    """이번 시도를 횟수에 넣지 않고 delay초 후 다시 처리되도록 작업을 돌려 놓습니다."""
+    get_connection().execute(
+        "UPDATE jobs SET available_at = ?, attempts = MAX(attempts - 1, 0) WHERE id = ?",
+        (time.time() + delay, job_id)
+    )
+
+
+def dead_letter_job(job_id: int, error: str):
+    """재시도 한도를 넘은 작업을 dead_jobs 테이블로 옮깁니다."""
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO dead_jobs (id, payload, attempts, created_at, failed_at, last_error) "
+            "SELECT id, payload, attempts, created_at, ?, ? FROM jobs WHERE id = ?",
+            (time.time(), error, job_id)
+        )
+        conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
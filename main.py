@@ -9,17 +9,6 @@ import random
 from datetime import datetime
 from urllib.parse import quote
 
-import requests
-
-# Google Cloud Tasks (선택적 - Render에서는 사용 안 함)
-try:
-    from google.cloud import tasks_v2
-    TASKS_AVAILABLE = True
-except ImportError:
-    tasks_v2 = None
-    TASKS_AVAILABLE = False
-    logging.warning("google-cloud-tasks not available. Cloud Tasks features disabled.")
-
 # GCF 표준 라이브러리 (선택적 - Render에서는 사용 안 함)
 try:
     import functions_framework
@@ -35,10 +24,9 @@ from slack_bolt.adapter.flask import SlackRequestHandler
 import sheets_handler 
 from config import SLACK_BOT_TOKEN 
 import worker_main
+import local_store
+import job_queue
 from datetime import timedelta
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -53,19 +41,41 @@ TASKS_QUEUE_ID = os.environ.get("TASKS_QUEUE_ID", "attendance-queue")
 # Render 환경에서는 RENDER_SERVICE_URL을 사용, 없으면 WORKER_URL 환경 변수 사용
 RENDER_SERVICE_URL = os.environ.get("RENDER_SERVICE_URL", "")
 WORKER_URL = os.environ.get("WORKER_URL") or (f"{RENDER_SERVICE_URL.rstrip('/')}/worker" if RENDER_SERVICE_URL else None)
+# 워커 호출 방식: queue(프로세스 내 작업 큐) | http(WORKER_URL 직접 호출) | tasks(Cloud Tasks)
+# Cloud Functions는 응답 후 백그라운드 스레드가 멈출 수 있으므로 기본값을 http로 둡니다.
+WORKER_DISPATCH_MODE = os.environ.get(
+    "WORKER_DISPATCH_MODE", "http" if os.environ.get("FUNCTION_TARGET") else "queue"
+).lower()
+
+# Cloud Tasks 클라이언트 (선택적 - Render에서는 사용 안 함)
+# google-cloud-tasks는 import 비용이 커서 처음 필요할 때 불러옵니다.
+_tasks_state = None  # (tasks_v2, tasks_client, queue_path) 또는 사용 불가면 (None, None, None)
+
+
+def _get_tasks_client():
+    """Cloud Tasks 모듈/클라이언트/큐 경로를 반환합니다. 사용할 수 없으면 (None, None, None)."""
+    global _tasks_state
+    if _tasks_state is not None:
+        return _tasks_state
+    if not PROJECT_ID:
+        _tasks_state = (None, None, None)
+        return _tasks_state
+
+    try:
+        from google.cloud import tasks_v2
+    except ImportError:
+        logging.warning("google-cloud-tasks not available. Cloud Tasks features disabled.")
+        _tasks_state = (None, None, None)
+        return _tasks_state
 
-# Cloud Tasks 클라이언트 (선택적)
-if TASKS_AVAILABLE and PROJECT_ID:
     try:
         tasks_client = tasks_v2.CloudTasksClient()
-        QUEUE_PATH = tasks_client.queue_path(PROJECT_ID, TASKS_LOCATION, TASKS_QUEUE_ID)
+        queue_path = tasks_client.queue_path(PROJECT_ID, TASKS_LOCATION, TASKS_QUEUE_ID)
+        _tasks_state = (tasks_v2, tasks_client, queue_path)
     except Exception as e:
         logging.warning(f"Failed to initialize Cloud Tasks client: {e}")
-        tasks_client = None
-        QUEUE_PATH = None
-else:
-    tasks_client = None
-    QUEUE_PATH = None
+        _tasks_state = (None, None, None)
+    return _tasks_state
 
 
 # 1. Slack 앱 초기화
@@ -87,6 +97,9 @@ def _get_today_site_address():
     Returns:
         str: 현장 주소. 일정이 없거나 주소가 없으면 SITE_ADDRESS 환경 변수 값 반환.
     """
+    # 캘린더를 조회할 때만 Google 라이브러리를 불러옴 (앱 시작 시간 단축)
+    from googleapiclient.errors import HttpError
+
     site_address = os.environ.get("SITE_ADDRESS", "")
     google_calendar_id = os.environ.get("GOOGLE_CALENDAR_ID", "")
     
@@ -95,44 +108,12 @@ def _get_today_site_address():
         return site_address
     
     try:
-        # 서비스 계정 인증
-        json_str = os.environ.get("GCF_CREDENTIALS")
-        if not json_str:
+        if not os.environ.get("GCF_CREDENTIALS"):
             logging.warning("GCF_CREDENTIALS not set; using SITE_ADDRESS")
             return site_address
-        
-        credentials_dict = json.loads(json_str)
-        creds = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar.readonly"]
-        )
-        
-        # Calendar API 서비스 생성
-        service = build("calendar", "v3", credentials=creds, cache_discovery=False)
-        
-        # 오늘 날짜의 시작/끝 시간 계산 (KST 기준)
-        now = datetime.now(sheets_handler.KST)
-        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
-        
-        # ISO 8601 형식으로 변환
-        time_min = start_of_day.isoformat()
-        time_max = end_of_day.isoformat()
-        
-        # 오늘 일정 조회
-        events_result = (
-            service.events()
-            .list(
-                calendarId=google_calendar_id,
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-        
-        events = events_result.get("items", [])
+
+        # 오늘 일정 조회 (공용 Calendar 클라이언트와 일정 캐시 재사용)
+        events = sheets_handler.get_today_calendar_events(google_calendar_id)
         
         if not events:
             logging.info("No events found for today; using SITE_ADDRESS")
@@ -172,6 +153,8 @@ def _get_week_schedule():
                 "is_all_day": False
             }
     """
+    from googleapiclient.errors import HttpError
+
     google_calendar_id = os.environ.get("GOOGLE_CALENDAR_ID", "")
 
     if not google_calendar_id:
@@ -179,19 +162,10 @@ def _get_week_schedule():
         return []
 
     try:
-        json_str = os.environ.get("GCF_CREDENTIALS")
-        if not json_str:
+        if not os.environ.get("GCF_CREDENTIALS"):
             logging.warning("GCF_CREDENTIALS not set for schedule")
             return []
 
-        credentials_dict = json.loads(json_str)
-        creds = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar.readonly"]
-        )
-
-        service = build("calendar", "v3", credentials=creds, cache_discovery=False)
-
         # 이번 주의 시작(월요일)과 끝(일요일) 계산
         now = datetime.now(sheets_handler.KST)
         current_weekday = now.weekday()  # 0=월요일, 6=일요일
@@ -205,19 +179,7 @@ def _get_week_schedule():
         time_min = start_of_week.isoformat()
         time_max = end_of_week.isoformat()
 
-        events_result = (
-            service.events()
-            .list(
-                calendarId=google_calendar_id,
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-
-        events = events_result.get("items", [])
+        events = sheets_handler.list_calendar_events(google_calendar_id, time_min, time_max)
 
         schedule_list = []
         day_names = ["월", "화", "수", "목", "금", "토", "일"]
@@ -579,7 +541,11 @@ def handle_material_quantity_submit(ack, body, client):
 def enqueue_task(action: str, body: dict):
     """출근/퇴근 처리를 비동기로 처리하기 위한 작업 큐 등록.
     
-    Render에서는 Cloud Tasks 대신 직접 HTTP 요청으로 worker를 호출합니다.
+    WORKER_DISPATCH_MODE에 따라 처리 방식을 고릅니다.
+      - queue: 프로세스 내 작업 큐에 넣고 바로 반환 (Render 기본값)
+      - http:  WORKER_URL로 직접 HTTP 요청
+      - tasks: Cloud Tasks에 등록
+    선택한 방식이 실패하면 HTTP → Cloud Tasks → 동기 처리 순으로 폴백합니다.
     """
     user_id = body.get("user_id")
     user_name = body.get("user_name")
@@ -590,13 +556,22 @@ def enqueue_task(action: str, body: dict):
         "user_id": user_id,
         "user_name": user_name,
         "channel_id": channel_id,
+        # 직접 호출 타임아웃 후 폴백이 다시 실행돼도 한 번만 처리되도록 같은 키를 전달
+        "idempotency_key": worker_main.make_idempotency_key(action, user_id, user_name),
     }
 
-    # Render 환경에서는 직접 HTTP 요청으로 worker 호출
-    if WORKER_URL:
+    # 프로세스 내 작업 큐 (Slack 핸들러는 바로 반환)
+    if WORKER_DISPATCH_MODE == "queue":
+        job_queue.start(worker_main.process_task)
+        if job_queue.enqueue(payload):
+            logging.info("Enqueued in-process job: action=%s user=%s channel=%s", action, user_name, channel_id)
+            return
+        logging.warning("In-process job queue unavailable; falling back for action=%s", action)
+
+    # 직접 HTTP 요청으로 worker 호출 (http 모드 또는 큐 폴백)
+    if WORKER_URL and WORKER_DISPATCH_MODE != "tasks":
         try:
-            import requests
-            response = requests.post(
+            response = sheets_handler.get_http_session("worker").post(
                 WORKER_URL,
                 json=payload,
                 headers={"Content-Type": "application/json"},
@@ -613,7 +588,8 @@ def enqueue_task(action: str, body: dict):
             pass
     
     # Cloud Tasks 사용 (GCP 환경에서만)
-    if TASKS_AVAILABLE and tasks_client and QUEUE_PATH:
+    tasks_v2, tasks_client, queue_path = _get_tasks_client()
+    if tasks_client and queue_path:
         try:
             task = {
                 "http_request": {
@@ -623,7 +599,7 @@ def enqueue_task(action: str, body: dict):
                     "body": json.dumps(payload).encode("utf-8"),
                 }
             }
-            tasks_client.create_task(parent=QUEUE_PATH, task=task)
+            tasks_client.create_task(parent=queue_path, task=task)
             logging.info(
                 "Enqueued task: action=%s user=%s channel=%s", action, user_name, channel_id
             )
@@ -640,12 +616,22 @@ def enqueue_task(action: str, body: dict):
         worker_main.worker(MockRequest())
     except Exception as e:
         logging.error(f"Failed to process synchronously: {e}")
-        # 최후의 수단: 기본 기록만 수행
+        # 최후의 수단: 기본 기록만 수행 (이미 처리된 작업이면 건너뜀)
         user_name = body.get("user_name")
+        idempotency_key = payload["idempotency_key"]
+        if idempotency_key and not local_store.claim_idempotency_key(idempotency_key):
+            logging.info("Skip duplicate fallback record: key=%s", idempotency_key)
+            return
+        success = False
         if action == "check_in":
-            sheets_handler.record_check_in(user_name)
+            success, _ = sheets_handler.record_check_in(user_name)
         elif action == "check_out":
-            sheets_handler.record_check_out(user_name)
+            success, _ = sheets_handler.record_check_out(user_name)
+        if idempotency_key:
+            if success:
+                local_store.complete_idempotency_key(idempotency_key)
+            else:
+                local_store.release_idempotency_key(idempotency_key)
 
 
 # ------------------------------------------------
@@ -658,7 +644,8 @@ def handle_hello(ack, body, client):
     user_id = body['user_id']
     try:
         # Sheets 핸들러를 사용하여 연결 테스트 (실제 Sheets 기록은 하지 않음)
-        service = sheets_handler._build_service()
+        with sheets_handler._google_clients():
+            service = sheets_handler._build_service()
         logging.info("Google Sheets 연결 성공: %s", service)
         client.chat_postMessage(
             channel=user_id,
@@ -685,7 +672,7 @@ def handle_netcheck(ack, body, client):
 
     url = "https://oauth2.googleapis.com/token"
     try:
-        resp = requests.get(url, timeout=10)
+        resp = sheets_handler.get_http_session().get(url, timeout=10)
         result = f"✅ 핸드셰이크 OK, 응답 코드 {resp.status_code}"
     except Exception as e:
         result = f"🚨 요청 실패: {e}"
@@ -1196,8 +1183,8 @@ def handle_send_payrolls(ack, body, client):
                 transportation = payroll['transportation']
                 total_pay = payroll['total_pay']
                 
-                # 총 근무일수 조회
-                total_days = sheets_handler.get_total_work_days(name)
+                # 총 근무일수 (급여 계산 시 함께 조회됨)
+                total_days = payroll.get('total_work_days', 0)
                 
                 # 평균 일당 계산
                 avg_daily_pay = base_pay // work_days if work_days > 0 else 0
@@ -1210,8 +1197,8 @@ def handle_send_payrolls(ack, body, client):
                         next_raise_days = end + 1
                         break
                 
-                # 인센티브 상세 내역 조회
-                commission_details = sheets_handler.get_commission_details(name, year, month)
+                # 인센티브 상세 내역 (급여 계산 시 함께 조회됨)
+                commission_details = payroll.get('commission_details', [])
                 
                 # 메시지 구성
                 msg = f"📋 **[{name}님 {year}년 {month}월 급여 명세서]**\n\n"
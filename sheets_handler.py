@@ -7,6 +7,9 @@ import ssl
 import functools
 import random
 import logging
+import threading
+import atexit
+import contextlib
 from datetime import datetime, timedelta
 from calendar import monthrange
 from typing import List, Dict, Any
@@ -14,11 +17,11 @@ from typing import List, Dict, Any
 import pytz
 import requests
 from requests.adapters import HTTPAdapter, Retry
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+
+import local_store
+
+# google.oauth2.service_account, googleapiclient(discovery, errors), httplib2는 import 비용이 커서
+# 첫 클라이언트를 만들 때 불러옵니다 (콜드 스타트 시 헬스 체크/Slack 응답을 늦추지 않도록).
 
 # 환경 변수에서 시트 키를 가져옵니다.
 SPREADSHEET_KEY = os.environ.get("SPREADSHEET_KEY")
@@ -49,59 +52,240 @@ SKILL_NAMES = {
 # 교통비 단가 (근무일당)
 TRANSPORTATION_RATE = 10000
 
+# UserMaster 캐시 유지 시간(초). 0이면 매번 시트를 다시 읽습니다.
+USER_MASTER_CACHE_TTL = float(os.environ.get("USER_MASTER_CACHE_TTL", "300"))
+# AttendanceLog 출근 인덱스 캐시 유지 시간(초). 0이면 매번 시트를 다시 읽습니다.
+ATTENDANCE_CACHE_TTL = float(os.environ.get("ATTENDANCE_CACHE_TTL", "60"))
+# 캘린더 일정 캐시 유지 시간(초). 0이면 매번 캘린더를 다시 조회합니다.
+CALENDAR_EVENTS_CACHE_TTL = float(os.environ.get("CALENDAR_EVENTS_CACHE_TTL", "120"))
+
+# 시트 행 추가 쓰기 지연 버퍼 (기본 비활성화). 켜면 APPEND_BUFFER_WINDOW초 동안 모아서 한 번에 추가합니다.
+APPEND_BUFFER_ENABLED = os.environ.get("SHEETS_APPEND_BUFFER", "").lower() in ("1", "true", "yes")
+APPEND_BUFFER_WINDOW = float(os.environ.get("SHEETS_APPEND_BUFFER_WINDOW", "2"))
+# 전송 전 행을 보관하는 스필 파일 디렉터리 (기본값은 로컬 DB와 같은 LOCAL_DATA_DIR 아래, 영구 디스크 권장)
+APPEND_SPILL_DIR = os.environ.get("SHEETS_APPEND_SPILL_DIR", os.path.join(local_store.LOCAL_DATA_DIR, "sheets_append_spill"))
+if APPEND_BUFFER_ENABLED:
+    local_store.warn_if_ephemeral(APPEND_SPILL_DIR, "시트 전송 대기 기록(스필 파일)")
+
 # ----------------------------------------------------
-# 1. Sheets 서비스 생성 (싱글톤 패턴으로 재사용)
+# 1. Google API 클라이언트 (API별 클라이언트 풀, 자격 증명 공유)
 # ----------------------------------------------------
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive"]
+# Google API HTTP 요청 타임아웃(초)
+GOOGLE_HTTP_TIMEOUT = float(os.environ.get("GOOGLE_HTTP_TIMEOUT", "30"))
+# API별 클라이언트 풀 크기. 모두 사용 중이면 GOOGLE_CLIENT_POOL_WAIT초까지 반납을 기다립니다.
+GOOGLE_CLIENT_POOL_SIZE = int(os.environ.get("GOOGLE_CLIENT_POOL_SIZE", "8"))
+GOOGLE_CLIENT_POOL_WAIT = float(os.environ.get("GOOGLE_CLIENT_POOL_WAIT", "10"))
+
+# httplib2 기반 클라이언트는 여러 스레드가 동시에 쓰면 연결이 꼬이므로, 호출 단위로 풀에서 빌려
+# 한 스레드만 쓰도록 합니다. 스레드 수와 관계없이 클라이언트(연결) 수는 풀 크기로 제한되고,
+# 짧게 사는 스레드(쓰기 지연 타이머, 워밍업 등)도 이미 만든 클라이언트와 연결을 재사용합니다.
+# 서비스 계정 자격 증명은 한 번만 파싱해 스코프별로 모든 클라이언트가 공유합니다.
+_credentials_cache = {}  # tuple(scopes) -> Credentials
+_credentials_lock = threading.Lock()
+_client_pools = {}  # (api, version) -> _ClientPool
+_client_pools_lock = threading.Lock()
+_client_pools_pid = None
+_thread_clients = threading.local()  # .lease: {(api, version): (_ClientPool, Resource, 풀 반납 여부)}
+
+
+def _get_credentials(scopes):
+    """GCF_CREDENTIALS를 한 번만 파싱해 스코프별 자격 증명을 재사용합니다."""
+    key = tuple(scopes)
+    with _credentials_lock:
+        creds = _credentials_cache.get(key)
+        if creds is None:
+            json_str = os.environ.get("GCF_CREDENTIALS")
+            if not json_str:
+                raise ValueError("GCF_CREDENTIALS 환경 변수가 설정되지 않았습니다.")
+
+            from google.oauth2 import service_account
+
+            credentials_dict = json.loads(json_str)
+            creds = service_account.Credentials.from_service_account_info(
+                credentials_dict,
+                scopes=scopes
+            )
+            _credentials_cache[key] = creds
+        return creds
+
+
+def _new_client(api: str, version: str, scopes):
+    """keep-alive 연결을 유지하는 자체 httplib2.Http를 가진 클라이언트를 새로 만듭니다."""
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import build
+
+    http = AuthorizedHttp(_get_credentials(scopes), http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT))
+    return build(api, version, http=http, cache_discovery=False)
+
+
+class _ClientPool:
+    """한 API(예: sheets v4)의 클라이언트를 최대 size개까지 만들어 돌려 쓰는 풀."""
+
+    def __init__(self, api: str, version: str, scopes, size: int):
+        self.api = api
+        self.version = version
+        self.scopes = scopes
+        self.size = max(1, size)
+        self._cond = threading.Condition()
+        self._idle = []
+        self._created = 0
+
+    def checkout(self):
+        """클라이언트를 빌립니다.
+
+        Returns:
+            (client, pooled): pooled가 False면 풀이 가득 차 임시로 만든 클라이언트라 반납하지 않습니다.
+        """
+        deadline = time.monotonic() + GOOGLE_CLIENT_POOL_WAIT
+        with self._cond:
+            while not self._idle and self._created >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if self._idle:
+                return self._idle.pop(), True
+            pooled = self._created < self.size
+            if pooled:
+                self._created += 1
+
+        if not pooled:
+            logging.warning(f"[Google] {self.api} 클라이언트 풀 부족 ({self.size}개 사용 중), 임시 클라이언트 사용")
+        try:
+            return _new_client(self.api, self.version, self.scopes), pooled
+        except Exception:
+            if pooled:
+                self._forget()
+            raise
+
+    def checkin(self, client, pooled: bool, broken: bool = False):
+        """빌린 클라이언트를 돌려줍니다. 연결 오류가 난 클라이언트(broken)는 버리고 자리만 비웁니다."""
+        if not pooled:
+            return
+        if broken:
+            self._forget()
+            return
+        with self._cond:
+            self._idle.append(client)
+            self._cond.notify()
+
+    def fill(self) -> int:
+        """빈 자리만큼 클라이언트를 미리 만들어 둡니다 (워밍업용). 새로 만든 개수를 반환합니다."""
+        built = 0
+        while True:
+            with self._cond:
+                if self._created >= self.size:
+                    return built
+                self._created += 1
+            try:
+                client = _new_client(self.api, self.version, self.scopes)
+            except Exception:
+                self._forget()
+                raise
+            self.checkin(client, True)
+            built += 1
 
-# 싱글톤 서비스 객체 캐시
-_sheets_service = None
-_drive_service = None
+    def _forget(self):
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
 
 
-def _build_service():
-    """Sheets API 서비스를 싱글톤으로 반환합니다."""
-    global _sheets_service
-    if _sheets_service is not None:
-        return _sheets_service
+def _client_pool(api: str, version: str, scopes) -> _ClientPool:
+    """API별 클라이언트 풀을 반환합니다. fork 이후에는 새로 만듭니다 (부모의 연결을 공유하지 않음)."""
+    global _client_pools_pid
+    with _client_pools_lock:
+        if _client_pools_pid != os.getpid():
+            _client_pools.clear()
+            _client_pools_pid = os.getpid()
+        pool = _client_pools.get((api, version))
+        if pool is None:
+            pool = _client_pools[(api, version)] = _ClientPool(api, version, scopes, GOOGLE_CLIENT_POOL_SIZE)
+        return pool
 
-    json_str = os.environ.get("GCF_CREDENTIALS")
-    if not json_str:
-        raise ValueError("GCF_CREDENTIALS 환경 변수가 설정되지 않았습니다.")
 
-    credentials_dict = json.loads(json_str)
-    creds = service_account.Credentials.from_service_account_info(
-        credentials_dict,
-        scopes=SCOPES
-    )
-    _sheets_service = build("sheets", "v4", credentials=creds, cache_discovery=False)
-    return _sheets_service
+@contextlib.contextmanager
+def _google_clients():
+    """블록 안에서 _get_client()로 받은 클라이언트를 블록이 끝날 때 풀에 반납합니다.
 
+    중첩해서 쓰면 가장 바깥 블록이 끝날 때 반납합니다.
+    """
+    if getattr(_thread_clients, "lease", None) is not None:
+        yield
+        return
 
-def _reset_sheets_service():
-    """Sheets 서비스 객체를 리셋합니다 (연결 오류 시 호출)."""
-    global _sheets_service
-    _sheets_service = None
-    logging.info("Sheets 서비스 객체 리셋됨")
+    lease = _thread_clients.lease = {}
+    try:
+        yield
+    finally:
+        _thread_clients.lease = None
+        for pool, client, pooled in lease.values():
+            pool.checkin(client, pooled)
 
 
-def _reset_drive_service():
-    """Drive 서비스 객체를 리셋합니다 (연결 오류 시 호출)."""
-    global _drive_service
-    _drive_service = None
-    logging.info("Drive 서비스 객체 리셋됨")
+def _get_client(api: str, version: str, scopes):
+    """현재 호출에서 쓸 Google API 클라이언트를 반환합니다.
+
+    _google_clients() 블록(execute_with_retry 포함) 안에서는 풀에서 빌린 클라이언트를 블록이 끝날 때까지
+    이 스레드만 씁니다. 블록 밖에서 부르면 풀과 무관한 새 클라이언트를 만듭니다.
+    """
+    lease = getattr(_thread_clients, "lease", None)
+    if lease is None:
+        logging.warning(f"[Google] {api} 클라이언트를 풀 밖에서 생성합니다 (_google_clients() 블록 밖 호출)")
+        return _new_client(api, version, scopes)
+
+    entry = lease.get((api, version))
+    if entry is None:
+        pool = _client_pool(api, version, scopes)
+        entry = lease[(api, version)] = (pool, *pool.checkout())
+    return entry[1]
+
+
+def _discard_leased_client(api: str, version: str) -> bool:
+    """현재 스레드가 빌린 클라이언트를 버립니다 (연결 오류 시). 다음 _get_client()는 다른 클라이언트를 빌립니다."""
+    lease = getattr(_thread_clients, "lease", None)
+    entry = lease.pop((api, version), None) if lease else None
+    if entry is None:
+        return False
+    pool, client, pooled = entry
+    pool.checkin(client, pooled, broken=True)
+    return True
+
+
+def _build_service():
+    """현재 호출에서 쓸 Sheets API 서비스를 반환합니다."""
+    return _get_client("sheets", "v4", SCOPES)
+
+
+def _build_drive_service():
+    """현재 호출에서 쓸 Google Drive API 서비스를 반환합니다."""
+    return _get_client("drive", "v3", DRIVE_SCOPES)
+
+
+def _reset_google_clients():
+    """현재 스레드가 빌린 모든 Google 서비스 객체(Sheets/Calendar/Drive)를 버립니다 (연결 오류 시 호출)."""
+    lease = getattr(_thread_clients, "lease", None)
+    for api, version in list(lease or {}):
+        if _discard_leased_client(api, version):
+            logging.info(f"{api} 서비스 객체 리셋됨")
 
 
 def execute_with_retry(func, max_retries=3, backoff_factor=1):
     """재시도 로직이 포함된 함수 실행 (연결 오류 시 서비스 리셋)"""
     for attempt in range(max_retries):
         try:
-            return func()
+            # 시도마다 풀에서 클라이언트를 빌리고, 대기(backoff) 중에는 반납해 둠
+            with _google_clients():
+                try:
+                    return func()
+                except (TimeoutError, ConnectionError, OSError):
+                    # 연결 관련 오류 시 이 호출이 빌린 서비스 객체(API 종류 무관)만 리셋 (다른 스레드의 연결은 유지)
+                    _reset_google_clients()
+                    raise
         except (TimeoutError, ConnectionError, OSError) as e:
-            # 연결 관련 오류 시 서비스 객체 리셋
-            _reset_sheets_service()
-            _reset_drive_service()
             if attempt == max_retries - 1:
                 raise
             wait_time = backoff_factor * (2 ** attempt)
@@ -116,33 +300,799 @@ def execute_with_retry(func, max_retries=3, backoff_factor=1):
 
 
 # ----------------------------------------------------
-# 2. 출퇴근 기록
+# 1-1. UserMaster 캐시 (프로세스 공용, TTL 기반)
 # ----------------------------------------------------
-def record_check_in(user_name: str, site_address: str = ""):
-    """출근 기록을 시트에 추가합니다."""
-    try:
+# 캐시에는 원본 값 대신 파싱된 사용자 테이블을 보관합니다.
+#   users:       시트 순서대로 정렬된 사용자 레코드 리스트
+#   by_slack_id: Slack_ID → 레코드
+#   by_name:     한글 이름 → 레코드
+#   by_row:      시트 행 번호(1-based) → 레코드
+# 레코드: {"row", "name", "slack_id", "base_work_days", "user_type", "address"}
+_user_master_lock = threading.Lock()
+_user_master_refresh_lock = threading.Lock()
+_user_table = None
+_user_master_loaded_at = 0.0
+
+
+def _fetch_user_master_values():
+    """UserMaster 시트 전체 값을 읽어옵니다 (캐시 미사용)."""
+    def _task():
+        service = _build_service()
+        resp = service.spreadsheets().values().get(
+            spreadsheetId=SPREADSHEET_KEY,
+            range="UserMaster!A:G"  # A: 이름, B: Slack_ID, C: 기본근무일수, D: 구분(사용자타입), F: 주소
+        ).execute()
+        return resp.get("values", [])
+
+    return execute_with_retry(_task)
+
+
+def _parse_user_row(row, row_number):
+    """UserMaster 한 행을 사용자 레코드로 변환합니다."""
+    name = row[0].strip() if len(row) > 0 else ""  # A열: 이름
+    slack_id = row[1].strip() if len(row) > 1 else ""  # B열: Slack_ID
+    base_days = 0
+    user_type = "정규직"  # 기본값
+    address = ""
+
+    # 기본근무일수 (C열)
+    if len(row) > 2 and row[2]:
+        try:
+            base_days = int(float(row[2]))
+        except (ValueError, TypeError):
+            base_days = 0
+
+    # 사용자 타입 (D열: "정규직" 또는 "교육생")
+    if len(row) > 3 and row[3]:
+        user_type = row[3].strip()
+
+    # 주소 (F열)
+    if len(row) > 5 and row[5]:
+        address = row[5].strip()
+
+    return {
+        "row": row_number,
+        "name": name,
+        "slack_id": slack_id,
+        "base_work_days": base_days,
+        "user_type": user_type,
+        "address": address,
+    }
+
+
+def _build_user_table(all_values):
+    """UserMaster 원본 값으로 Slack_ID/이름/행 번호 인덱스를 만듭니다.
+
+    같은 키가 여러 행에 있으면 위쪽(먼저 나온) 행을 사용합니다.
+    사용자 조회(users, by_slack_id, by_name)는 이름/Slack_ID 열이 모두 있는 행만 쓰고,
+    근무일수를 쓸 행 찾기(row_by_name)는 A열 이름만 있는 행도 포함합니다.
+    """
+    users = []
+    by_slack_id = {}
+    by_name = {}
+    by_row = {}
+    row_by_name = {}
+
+    # 헤더 제외 (2행부터)
+    for row_number, row in enumerate(all_values[1:], start=2):
+        if not row:
+            continue
+        user = _parse_user_row(row, row_number)
+        if user["name"]:
+            row_by_name.setdefault(user["name"], row_number)
+        if len(row) < 2 or (not user["name"] and not user["slack_id"]):
+            continue
+        users.append(user)
+        by_row[row_number] = user
+        if user["slack_id"]:
+            by_slack_id.setdefault(user["slack_id"], user)
+        if user["name"]:
+            by_name.setdefault(user["name"], user)
+
+    return {
+        "users": users,
+        "by_slack_id": by_slack_id,
+        "by_name": by_name,
+        "by_row": by_row,
+        "row_by_name": row_by_name,
+    }
+
+
+def _cached_user_table():
+    """유효한 캐시가 있으면 반환하고, 없거나 만료되었으면 None을 반환합니다."""
+    with _user_master_lock:
+        if _user_table is None:
+            return None
+        if time.monotonic() - _user_master_loaded_at >= USER_MASTER_CACHE_TTL:
+            return None
+        return _user_table
+
+
+def _get_user_table(force_refresh: bool = False):
+    """파싱된 UserMaster 테이블을 캐시에서 반환합니다.
+
+    캐시가 비었거나 TTL이 지났으면 시트를 한 번만 다시 읽습니다.
+    동시에 여러 스레드가 요청해도 실제 조회는 한 번만 수행됩니다.
+    """
+    if not force_refresh:
+        cached = _cached_user_table()
+        if cached is not None:
+            return cached
+
+    with _user_master_refresh_lock:
+        # 대기하는 동안 다른 스레드가 이미 갱신했을 수 있음
+        if not force_refresh:
+            cached = _cached_user_table()
+            if cached is not None:
+                return cached
+
+        return _prime_user_master_cache(_fetch_user_master_values())
+
+
+def _prime_user_master_cache(all_values):
+    """이미 읽어온 UserMaster 값으로 캐시를 채우고 파싱된 테이블을 반환합니다."""
+    global _user_table, _user_master_loaded_at
+    table = _build_user_table(all_values)
+    with _user_master_lock:
+        _user_table = table
+        _user_master_loaded_at = time.monotonic()
+    return table
+
+
+def invalidate_user_master_cache():
+    """UserMaster 캐시를 비웁니다. 다음 조회 시 시트를 다시 읽습니다."""
+    global _user_table, _user_master_loaded_at
+    with _user_master_lock:
+        _user_table = None
+        _user_master_loaded_at = 0.0
+    logging.info("UserMaster 캐시 무효화됨")
+
+
+def _find_user(user_key, table=None):
+    """Slack_ID 또는 이름으로 사용자 레코드를 찾습니다 (O(1)).
+
+    두 인덱스에 모두 걸리면 시트에서 더 위쪽 행을 반환합니다.
+    """
+    if not user_key:
+        return None
+    if table is None:
+        table = _get_user_table()
+    candidates = [
+        user for user in (table["by_slack_id"].get(user_key), table["by_name"].get(user_key))
+        if user is not None
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda user: user["row"])
+
+
+def _set_cached_base_work_days(row_index: int, new_base_days: int):
+    """캐시된 사용자 레코드의 base_work_days(C열)를 갱신합니다 (write-through)."""
+    with _user_master_lock:
+        if _user_table is None:
+            return
+        user = _user_table["by_row"].get(row_index)
+        if user is not None:
+            user["base_work_days"] = new_base_days
+
+
+# ----------------------------------------------------
+# 1-2. AttendanceLog 출근 인덱스 (프로세스 공용, TTL 기반)
+# ----------------------------------------------------
+# AttendanceLog 전체를 한 번 읽어 {이름: {"YYYY-MM": [정렬된 고유 출근 날짜]}} 형태로 보관합니다.
+# 월별 근무일수, 급여 계산 등 출근 기록을 조회하는 함수는 모두 이 인덱스를 사용합니다.
+_attendance_lock = threading.Lock()
+_attendance_refresh_lock = threading.Lock()
+_attendance_index = None
+_attendance_loaded_at = 0.0
+
+
+def _fetch_attendance_values():
+    """AttendanceLog 시트 전체 값을 읽어옵니다 (캐시 미사용)."""
+    flush_appends()  # 버퍼에 남은 출퇴근 행이 읽기 결과에 포함되도록
+    def _task():
+        service = _build_service()
+        resp = service.spreadsheets().values().get(
+            spreadsheetId=SPREADSHEET_KEY,
+            range="AttendanceLog!A:E"
+        ).execute()
+        return resp.get("values", [])
+
+    return execute_with_retry(_task)
+
+
+def _build_attendance_index(all_values):
+    """AttendanceLog 원본 값으로 사용자별·월별 출근 날짜 인덱스를 만듭니다."""
+    if len(all_values) < 2:
+        return {}
+
+    headers = all_values[0]
+    date_idx = headers.index("날짜") if "날짜" in headers else 0
+    name_idx = headers.index("이름") if "이름" in headers else 1
+    type_idx = headers.index("구분") if "구분" in headers else 3
+
+    dates_by_user = {}
+    for row in all_values[1:]:
+        if len(row) > date_idx and len(row) > name_idx and len(row) > type_idx:
+            if row[type_idx] == "출근":
+                date_str = row[date_idx]
+                months = dates_by_user.setdefault(row[name_idx], {})
+                months.setdefault(date_str[:7], set()).add(date_str)
+
+    return {
+        name: {month: sorted(dates) for month, dates in months.items()}
+        for name, months in dates_by_user.items()
+    }
+
+
+def _cached_attendance_index():
+    """유효한 캐시가 있으면 반환하고, 없거나 만료되었으면 None을 반환합니다."""
+    with _attendance_lock:
+        if _attendance_index is None:
+            return None
+        if time.monotonic() - _attendance_loaded_at >= ATTENDANCE_CACHE_TTL:
+            return None
+        return _attendance_index
+
+
+def _get_attendance_index(force_refresh: bool = False):
+    """사용자별·월별 출근 날짜 인덱스를 캐시에서 반환합니다.
+
+    캐시가 비었거나 TTL이 지났으면 AttendanceLog를 한 번만 다시 읽습니다.
+    """
+    if not force_refresh:
+        cached = _cached_attendance_index()
+        if cached is not None:
+            return cached
+
+    with _attendance_refresh_lock:
+        if not force_refresh:
+            cached = _cached_attendance_index()
+            if cached is not None:
+                return cached
+
+        return _prime_attendance_cache(_fetch_attendance_values())
+
+
+def _prime_attendance_cache(all_values):
+    """이미 읽어온 AttendanceLog 값으로 캐시를 채우고 인덱스를 반환합니다."""
+    global _attendance_index, _attendance_loaded_at
+    index = _build_attendance_index(all_values)
+    with _attendance_lock:
+        _attendance_index = index
+        _attendance_loaded_at = time.monotonic()
+    return index
+
+
+def invalidate_attendance_cache():
+    """AttendanceLog 출근 인덱스 캐시를 비웁니다."""
+    global _attendance_index, _attendance_loaded_at
+    with _attendance_lock:
+        _attendance_index = None
+        _attendance_loaded_at = 0.0
+    logging.info("AttendanceLog 캐시 무효화됨")
+
+
+def _add_cached_check_in(user_name: str, date_str: str):
+    """방금 기록한 출근을 캐시된 인덱스에도 반영합니다 (write-through)."""
+    with _attendance_lock:
+        if _attendance_index is None:
+            return
+        months = _attendance_index.setdefault(user_name, {})
+        dates = months.setdefault(date_str[:7], [])
+        if date_str not in dates:
+            dates.append(date_str)
+            dates.sort()
+
+
+def get_user_attendance_months(user_name: str):
+    """사용자의 월별 출근 날짜를 반환합니다.
+
+    Returns:
+        dict: {"YYYY-MM": [정렬된 고유 출근 날짜(str)], ...}
+    """
+    # 캐시된 인덱스를 호출한 쪽에서 수정해도 캐시가 바뀌지 않도록 복사본을 반환
+    months = _get_attendance_index().get(user_name, {})
+    return {month: list(dates) for month, dates in months.items()}
+
+
+# ----------------------------------------------------
+# 1-3. 여러 시트 일괄 조회 (values.batchGet)
+# ----------------------------------------------------
+# 시트 이름 → 읽기 범위
+SHEET_RANGES = {
+    "UserMaster": "UserMaster!A:G",  # A: 이름, B: Slack_ID, C: 기본근무일수, D: 구분(사용자타입), F: 주소
+    "AttendanceLog": "AttendanceLog!A:E",  # 날짜, 이름, 시간, 구분, 비고
+    "Incentive": "Incentive!A:F",  # 날짜, 이름, 금액, 내용
+    "MaterialOrder": "MaterialOrder!A:D",  # 날짜시간, 이름, 발주내용, 발주완료 처리시간
+}
+
+# 없어도 되는 시트 (없으면 빈 값으로 처리)
+OPTIONAL_SHEETS = {"Incentive"}
+
+
+def batch_get_values(sheet_names: List[str]) -> Dict[str, list]:
+    """여러 시트를 values.batchGet 한 번으로 읽어 원본 값을 반환합니다.
+
+    OPTIONAL_SHEETS에 속한 시트가 없으면 batchGet 전체가 400으로 실패하므로,
+    그때는 나머지 시트만 다시 읽고 없는 시트는 빈 리스트로 채웁니다.
+
+    Args:
+        sheet_names: SHEET_RANGES의 키 목록 (예: ["UserMaster", "AttendanceLog"])
+
+    Returns:
+        dict: {시트 이름: 값 리스트(헤더 포함)}
+    """
+    from googleapiclient.errors import HttpError
+
+    flush_appends()  # 버퍼에 남은 행이 읽기 결과에 포함되도록
+
+    def _batch_get(names):
+        ranges = [SHEET_RANGES[name] for name in names]
+
         def _task():
             service = _build_service()
-            now_kst = datetime.now(KST)
-            body = {
-                "values": [[
-                    now_kst.strftime("%Y-%m-%d"),
-                    user_name,
-                    now_kst.strftime("%H:%M:%S"),
-                    "출근",
-                    site_address  # 비고란에 현장 주소 포함
-                ]]
-            }
-            request = service.spreadsheets().values().append(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="AttendanceLog!A:E",
-                valueInputOption="USER_ENTERED",
-                insertDataOption="INSERT_ROWS",
-                body=body
+            try:
+                resp = service.spreadsheets().values().batchGet(
+                    spreadsheetId=SPREADSHEET_KEY,
+                    ranges=ranges
+                ).execute()
+            except HttpError as e:
+                if e.resp.status == 400:
+                    return None  # 잘못된 범위 (시트 없음) - 재시도하지 않음
+                raise
+            value_ranges = resp.get("valueRanges", [])
+            return {name: value_range.get("values", []) for name, value_range in zip(names, value_ranges)}
+
+        return execute_with_retry(_task)
+
+    names = list(dict.fromkeys(sheet_names))
+    if not names:
+        return {}
+
+    tables = _batch_get(names)
+    if tables is None:
+        required = [name for name in names if name not in OPTIONAL_SHEETS]
+        tables = _batch_get(required) if required else {}
+        if tables is None:
+            raise ValueError(f"시트를 읽을 수 없습니다: {', '.join(required)}")
+
+    for name in names:
+        tables.setdefault(name, [])
+    return tables
+
+
+def batch_get_tables(sheet_names: List[str]) -> Dict[str, Any]:
+    """여러 시트를 한 번에 읽어 파싱된 테이블로 반환합니다.
+
+    - UserMaster: 사용자 테이블 (UserMaster 캐시도 갱신)
+    - AttendanceLog: {이름: {"YYYY-MM": [출근 날짜]}} (출근 인덱스 캐시도 갱신)
+    - Incentive: {이름: {"YYYY-MM": [인센티브 항목]}}
+    - 그 외 시트: 원본 값 리스트
+    """
+    parsers = {
+        "UserMaster": _prime_user_master_cache,
+        "AttendanceLog": _prime_attendance_cache,
+        "Incentive": _build_incentive_index,
+    }
+    values_by_sheet = batch_get_values(sheet_names)
+    return {
+        name: parsers[name](values) if name in parsers else values
+        for name, values in values_by_sheet.items()
+    }
+
+
+def prefetch_tables(sheet_names: List[str]):
+    """캐시가 비었거나 만료된 시트만 골라 batchGet 한 번으로 미리 읽어 둡니다.
+
+    지원 시트: UserMaster, AttendanceLog. 이후 조회 함수들은 캐시를 그대로 사용합니다.
+    """
+    stale_checks = {
+        "UserMaster": _cached_user_table,
+        "AttendanceLog": _cached_attendance_index,
+    }
+    stale = [name for name in sheet_names if name in stale_checks and stale_checks[name]() is None]
+    if stale:
+        batch_get_tables(stale)
+
+
+# ----------------------------------------------------
+# 1-4. 시트 행 추가 (쓰기 지연 버퍼)
+# ----------------------------------------------------
+# 버퍼를 켜면 같은 시트로 가는 행들을 짧은 구간 동안 모아 한 번의 append로 전송합니다.
+# 큐에 들어간 행은 먼저 로컬 스필 파일에 기록되므로 프로세스가 죽어도 다음 기동 시 다시 전송됩니다.
+_append_lock = threading.Lock()
+_append_flush_lock = threading.Lock()
+_pending_appends: Dict[str, list] = {}  # range -> [row, ...] (입력 순서 유지)
+_append_flush_timer = None
+_append_spill_replayed_pid = None  # 스필 파일을 복구한 프로세스 pid (fork 후 재복구용)
+_append_atexit_registered = False
+
+
+def _append_rows_now(range_name: str, rows: list):
+    """여러 행을 한 번의 values.append 호출로 즉시 추가합니다."""
+    def _task():
+        service = _build_service()
+        request = service.spreadsheets().values().append(
+            spreadsheetId=SPREADSHEET_KEY,
+            range=range_name,
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={"values": rows}
+        )
+        return request.execute()
+
+    return execute_with_retry(_task)
+
+
+def _append_spill_path(pid: int = None) -> str:
+    return os.path.join(APPEND_SPILL_DIR, f"append-spill-{pid or os.getpid()}.jsonl")
+
+
+def _pid_alive(pid: int) -> bool:
+    """같은 호스트에서 해당 pid 프로세스가 살아있는지 확인합니다. (POSIX 전용)"""
+    if os.name != "posix":
+        return True  # 확인할 수 없으면 다른 프로세스의 파일은 건드리지 않음
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _write_spill_locked():
+    """현재 대기 중인 행 전체로 이 프로세스의 스필 파일을 원자적으로 다시 씁니다. (_append_lock 보유 상태에서 호출)"""
+    path = _append_spill_path()
+    if not _pending_appends:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for range_name, rows in _pending_appends.items():
+            for row in rows:
+                f.write(json.dumps({"range": range_name, "row": row}, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _spill_row_locked(range_name: str, row: list):
+    """행 하나를 스필 파일 끝에 추가하고 디스크에 동기화합니다. (_append_lock 보유 상태에서 호출)"""
+    with open(_append_spill_path(), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"range": range_name, "row": row}, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _replay_spilled_appends_locked():
+    """종료된 프로세스(또는 이전의 자기 자신)가 남긴 스필 파일을 대기열로 가져옵니다. (_append_lock 보유 상태에서 호출)"""
+    global _append_spill_replayed_pid
+    if _append_spill_replayed_pid == os.getpid():
+        return
+    _append_spill_replayed_pid = os.getpid()
+
+    os.makedirs(APPEND_SPILL_DIR, exist_ok=True)
+    claimed = []
+    for filename in sorted(os.listdir(APPEND_SPILL_DIR)):
+        if not (filename.startswith("append-spill-") and filename.endswith(".jsonl")):
+            continue
+        try:
+            pid = int(filename[len("append-spill-"):-len(".jsonl")])
+        except ValueError:
+            continue
+        if pid != os.getpid() and _pid_alive(pid):
+            continue
+
+        path = os.path.join(APPEND_SPILL_DIR, filename)
+        restored = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue  # 기록 도중 죽어 잘린 마지막 줄
+                _pending_appends.setdefault(item["range"], []).append(item["row"])
+                restored += 1
+        claimed.append(path)
+        logging.info(f"[Sheets] 스필 파일 복구: {filename} ({restored}행)")
+
+    if claimed:
+        # 가져온 행을 내 스필 파일에 먼저 기록한 뒤 원본을 지웁니다.
+        _write_spill_locked()
+        for path in claimed:
+            if path != _append_spill_path():
+                os.remove(path)
+        _schedule_append_flush_locked()
+
+
+def _schedule_append_flush_locked():
+    global _append_flush_timer
+    if _append_flush_timer is not None:
+        return
+    _append_flush_timer = threading.Timer(APPEND_BUFFER_WINDOW, _flush_appends_from_timer)
+    _append_flush_timer.daemon = True
+    _append_flush_timer.start()
+
+
+def _flush_appends_from_timer():
+    global _append_flush_timer
+    with _append_lock:
+        _append_flush_timer = None
+    flush_appends()
+
+
+def _append_row(range_name: str, row: list):
+    """시트에 행 하나를 추가합니다. 버퍼 사용 시 대기열에 넣고 바로 반환합니다."""
+    if not APPEND_BUFFER_ENABLED:
+        _append_rows_now(range_name, [row])
+        return
+
+    global _append_atexit_registered
+    with _append_lock:
+        if not _append_atexit_registered:
+            atexit.register(flush_appends)
+            _append_atexit_registered = True
+        _replay_spilled_appends_locked()
+        _spill_row_locked(range_name, row)
+        _pending_appends.setdefault(range_name, []).append(row)
+        _schedule_append_flush_locked()
+
+
+def flush_appends() -> int:
+    """대기 중인 행을 시트별로 한 번씩 append 합니다. 실패한 행은 대기열에 남겨 다음에 다시 시도합니다.
+
+    Returns:
+        전송에 성공한 행 수
+    """
+    if not APPEND_BUFFER_ENABLED:
+        return 0
+
+    global _pending_appends
+    with _append_flush_lock:
+        with _append_lock:
+            _replay_spilled_appends_locked()
+            batches = _pending_appends
+            _pending_appends = {}
+
+        sent = 0
+        failed = {}
+        for range_name, rows in batches.items():
+            try:
+                _append_rows_now(range_name, rows)
+                sent += len(rows)
+                logging.info(f"[Sheets] {range_name} {len(rows)}행 일괄 추가")
+            except Exception as e:
+                failed[range_name] = rows
+                logging.error(f"[Sheets] {range_name} {len(rows)}행 추가 실패, 대기열 유지: {e}")
+
+        with _append_lock:
+            for range_name, rows in failed.items():
+                _pending_appends[range_name] = rows + _pending_appends.get(range_name, [])
+            _write_spill_locked()
+            if _pending_appends:
+                _schedule_append_flush_locked()
+
+    return sent
+
+
+# ----------------------------------------------------
+# 1-5. Google Calendar 일정 캐시
+# ----------------------------------------------------
+# 출근/자재 입력/사진 폴더 생성 때마다 같은 날의 일정을 다시 조회하지 않도록
+# (캘린더 ID, timeMin, timeMax) 단위로 events.list 결과를 짧게 캐시합니다.
+CALENDAR_SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
+_calendar_events_cache = {}  # (calendar_id, time_min, time_max) -> (loaded_at, events)
+_calendar_events_lock = threading.Lock()
+_calendar_refresh_lock = threading.Lock()
+
+
+def _build_calendar_service():
+    """현재 호출에서 쓸 Google Calendar API 서비스를 반환합니다."""
+    return _get_client("calendar", "v3", CALENDAR_SCOPES)
+
+
+def _cached_calendar_events(key):
+    with _calendar_events_lock:
+        entry = _calendar_events_cache.get(key)
+    if entry and time.monotonic() - entry[0] < CALENDAR_EVENTS_CACHE_TTL:
+        return entry[1]
+    return None
+
+
+def list_calendar_events(calendar_id: str, time_min: str, time_max: str) -> list:
+    """기간 내 캘린더 일정(items)을 시작 시간 순으로 반환합니다. (TTL 캐시)
+
+    조회에 실패해도 이전에 받아둔 결과가 있으면 그 값을 반환하고, 없으면 예외를 그대로 올립니다.
+    """
+    key = (calendar_id, time_min, time_max)
+    events = _cached_calendar_events(key)
+    if events is not None:
+        return events
+
+    with _calendar_refresh_lock:
+        # 대기하는 동안 다른 스레드가 이미 조회했으면 그 결과를 사용
+        events = _cached_calendar_events(key)
+        if events is not None:
+            return events
+
+        def _task():
+            service = _build_calendar_service()
+            result = service.events().list(
+                calendarId=calendar_id,
+                timeMin=time_min,
+                timeMax=time_max,
+                singleEvents=True,
+                orderBy="startTime",
+            ).execute()
+            return result.get("items", [])
+
+        try:
+            events = execute_with_retry(_task)
+        except Exception as e:
+            with _calendar_events_lock:
+                stale = _calendar_events_cache.get(key)
+            if stale is None:
+                raise
+            logging.warning(f"[Calendar] 일정 조회 실패, 이전 결과 사용: {e}")
+            return stale[1]
+
+        now = time.monotonic()
+        with _calendar_events_lock:
+            # 지난 기간(어제 등)의 만료된 항목은 정리
+            for old_key in [k for k, (loaded_at, _) in _calendar_events_cache.items()
+                            if now - loaded_at >= CALENDAR_EVENTS_CACHE_TTL]:
+                del _calendar_events_cache[old_key]
+            _calendar_events_cache[key] = (now, events)
+        return events
+
+
+def get_today_calendar_events(calendar_id: str) -> list:
+    """오늘(KST 0시~24시) 캘린더 일정을 반환합니다. (TTL 캐시)"""
+    start_of_day = datetime.now(KST).replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_day = start_of_day + timedelta(days=1)
+    return list_calendar_events(calendar_id, start_of_day.isoformat(), end_of_day.isoformat())
+
+
+def invalidate_calendar_cache():
+    """캘린더 일정 캐시를 비웁니다."""
+    with _calendar_events_lock:
+        _calendar_events_cache.clear()
+
+
+# ----------------------------------------------------
+# 1-6. 기동 워밍업 (클라이언트 생성, 토큰 발급, 캐시 채우기)
+# ----------------------------------------------------
+def _warm_client(api: str, version: str, scopes):
+    """API 클라이언트 풀을 끝까지 채우고, 액세스 토큰이 없으면 미리 발급받습니다.
+
+    클라이언트는 호출마다 풀에서 빌려 쓰므로, 어느 스레드(I/O 실행기, 작업 큐, gunicorn 요청 스레드)가
+    처음 호출하더라도 이미 만든 클라이언트를 받습니다. 토큰은 모든 클라이언트가 공유합니다.
+    """
+    _client_pool(api, version, scopes).fill()
+    creds = _get_credentials(scopes)
+    if not creds.valid:
+        import httplib2
+        from google_auth_httplib2 import Request
+
+        creds.refresh(Request(httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT)))
+
+
+def warm_up(calendar_id: str = "") -> Dict[str, Any]:
+    """배포/스케일 아웃 직후 첫 요청이 평소 속도로 처리되도록 미리 준비합니다.
+
+    - 자격 증명 파싱, 액세스 토큰 발급
+    - Sheets / Calendar / Drive 클라이언트 풀 채우기 (GOOGLE_CLIENT_POOL_SIZE개씩)
+    - UserMaster, AttendanceLog 출근 인덱스, 오늘 캘린더 일정 캐시 채우기 (연결 수립 포함)
+
+    단계가 실패해도 로그만 남기고 다음 단계를 계속합니다.
+    걸린 시간과 오류 내용은 로그에만 남기고, 반환값에는 성공 여부만 담습니다 (외부 응답에 내부 정보 노출 방지).
+
+    Returns:
+        단계 이름 -> "ok" 또는 "error"
+    """
+    steps = [
+        ("sheets_client", lambda: _warm_client("sheets", "v4", SCOPES)),
+        ("calendar_client", lambda: _warm_client("calendar", "v3", CALENDAR_SCOPES)),
+        ("drive_client", lambda: _warm_client("drive", "v3", DRIVE_SCOPES)),
+        ("user_master", _get_user_table),
+        ("attendance_index", _get_attendance_index),
+    ]
+    if calendar_id:
+        steps.append(("today_calendar", lambda: get_today_calendar_events(calendar_id)))
+
+    results = {}
+    elapsed = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            results[name] = "ok"
+            elapsed[name] = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            results[name] = "error"
+            logging.warning(f"[warm_up] {name} 실패: {e}")
+    logging.info(f"[warm_up] 완료: {results}, 소요 시간(초): {elapsed}")
+    return results
+
+
+# ----------------------------------------------------
+# 1-7. 외부 HTTP 세션 (용도별 연결 풀, keep-alive, 재시도)
+# ----------------------------------------------------
+# 카카오/기상청/워커 호출마다 TCP·TLS 연결을 새로 맺지 않도록 용도별 requests.Session을 재사용합니다.
+# 호스트별 연결 풀 크기: 같은 호스트로 동시에 나가는 요청 수(워커 I/O lane 한도)보다 크게 둡니다.
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))
+
+# 재시도 중 Retry-After만큼 기다리면 출근 메시지가 늦어지므로 헤더는 따르지 않고 짧은 backoff만 둡니다.
+# 재시도 후에도 오류 상태 코드면 예외 대신 응답을 돌려주어 호출부의 raise_for_status()가 처리합니다.
+_HTTP_SESSION_RETRIES = {
+    # 카카오 로컬 / 모빌리티 (dapi.kakao.com, apis-navi.kakaomobility.com)
+    "kakao": Retry(
+        total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}), respect_retry_after_header=False, raise_on_status=False,
+    ),
+    # 기상청 단기예보 (apis.data.go.kr): 응답이 느린 편이라 한 번만 재시도
+    "kma": Retry(
+        total=1, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}), respect_retry_after_header=False, raise_on_status=False,
+    ),
+    # 워커 POST (WORKER_URL): 요청이 전송되지 않은 연결 실패만 재시도
+    "worker": Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.5, raise_on_status=False),
+    # 그 외 (네트워크 진단 등): 재시도 없음
+    "default": Retry(total=0, raise_on_status=False),
+}
+_http_sessions = {}  # 용도 이름 -> requests.Session
+_http_sessions_lock = threading.Lock()
+_http_sessions_pid = None
+
+
+def get_http_session(name: str = "default") -> requests.Session:
+    """용도별 공유 requests.Session을 반환합니다. fork 이후에는 새로 만듭니다.
+
+    Args:
+        name: "kakao" | "kma" | "worker" | "default" (재시도 정책이 다름)
+    """
+    global _http_sessions_pid
+    with _http_sessions_lock:
+        if _http_sessions_pid != os.getpid():
+            # 부모 프로세스의 연결은 자식과 공유하면 안 됨
+            _http_sessions.clear()
+            _http_sessions_pid = os.getpid()
+
+        session = _http_sessions.get(name)
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=_HTTP_SESSION_RETRIES.get(name, _HTTP_SESSION_RETRIES["default"]),
             )
-            return request.execute()
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_sessions[name] = session
+        return session
 
-        execute_with_retry(_task)
+
+# ----------------------------------------------------
+# 2. 출퇴근 기록
+# ----------------------------------------------------
+def record_check_in(user_name: str, site_address: str = ""):
+    """출근 기록을 시트에 추가합니다."""
+    try:
+        now_kst = datetime.now(KST)
+        _append_row("AttendanceLog!A:E", [
+            now_kst.strftime("%Y-%m-%d"),
+            user_name,
+            now_kst.strftime("%H:%M:%S"),
+            "출근",
+            site_address  # 비고란에 현장 주소 포함
+        ])
+        _add_cached_check_in(user_name, now_kst.strftime("%Y-%m-%d"))
         return True, "출근 기록이 정상적으로 저장되었습니다."
     except Exception as e:
         return False, f"출근 기록 오류: {str(e)}"
@@ -151,28 +1101,14 @@ def record_check_in(user_name: str, site_address: str = ""):
 def record_check_out(user_name: str):
     """퇴근 기록을 시트에 추가합니다."""
     try:
-        def _task():
-            service = _build_service()
-            now_kst = datetime.now(KST)
-            body = {
-                "values": [[
-                    now_kst.strftime("%Y-%m-%d"),
-                    user_name,
-                    now_kst.strftime("%H:%M:%S"),
-                    "퇴근",
-                    ""  # 비고란은 빈 값
-                ]]
-            }
-            request = service.spreadsheets().values().append(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="AttendanceLog!A:E",
-                valueInputOption="USER_ENTERED",
-                insertDataOption="INSERT_ROWS",
-                body=body
-            )
-            return request.execute()
-
-        execute_with_retry(_task)
+        now_kst = datetime.now(KST)
+        _append_row("AttendanceLog!A:E", [
+            now_kst.strftime("%Y-%m-%d"),
+            user_name,
+            now_kst.strftime("%H:%M:%S"),
+            "퇴근",
+            ""  # 비고란은 빈 값
+        ])
         return True, "퇴근 기록이 정상적으로 저장되었습니다."
     except Exception as e:
         return False, f"퇴근 기록 오류: {str(e)}"
@@ -185,7 +1121,7 @@ def get_total_work_days(user_name: str):
     """사용자의 총 근무일수를 반환합니다.
 
     UserMaster 시트의 base_work_days(C열) 값만 반환합니다.
-    퇴근 시 update_user_base_work_days()로 이 값이 +1 증가됩니다.
+    퇴근 시 increment_user_base_work_days()로 이 값이 +1 증가됩니다.
     """
     try:
         user_info = get_user_info(user_name)
@@ -200,45 +1136,117 @@ def get_total_work_days(user_name: str):
 # ----------------------------------------------------
 # 3-1. UserMaster base_work_days 업데이트
 # ----------------------------------------------------
-def update_user_base_work_days(user_name: str, new_base_days: int):
-    """UserMaster 시트의 base_work_days(C열)를 업데이트합니다."""
-    try:
-        def _task():
-            service = _build_service()
-            # 1. UserMaster에서 사용자 행 찾기
-            resp = service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="UserMaster!A:G"
-            ).execute()
-            all_values = resp.get("values", [])
+def _resolve_user_row(user_name: str):
+    """이름 인덱스에서 사용자 행 번호를 찾습니다. 없으면 시트를 새로 읽어 한 번 더 확인합니다."""
+    name_key = user_name.strip()
+    row_index = _get_user_table()["row_by_name"].get(name_key)
+    if row_index is None:
+        row_index = _get_user_table(force_refresh=True)["row_by_name"].get(name_key)
+    return row_index
+
+
+def _write_base_work_days(row_index: int, new_base_days: int):
+    """UserMaster C열(base_work_days)에 절대값을 씁니다. 같은 값을 다시 써도 결과가 같아 재시도에 안전합니다."""
+    def _task():
+        service = _build_service()
+        service.spreadsheets().values().update(
+            spreadsheetId=SPREADSHEET_KEY,
+            range=f"UserMaster!C{row_index}",
+            valueInputOption="RAW",
+            body={"values": [[new_base_days]]}
+        ).execute()
 
-            row_index = None
-            for i, row in enumerate(all_values):
-                if len(row) > 0 and row[0].strip() == user_name.strip():
-                    row_index = i + 1  # 1-based index for Sheets
-                    break
+    execute_with_retry(_task)
+    _set_cached_base_work_days(row_index, new_base_days)
 
-            if row_index is None:
-                logging.warning(f"[update_user_base_work_days] 사용자 '{user_name}' 찾을 수 없음")
-                return False
 
-            # 2. C열(base_work_days) 업데이트
-            service.spreadsheets().values().update(
-                spreadsheetId=SPREADSHEET_KEY,
-                range=f"UserMaster!C{row_index}",
-                valueInputOption="RAW",
-                body={"values": [[new_base_days]]}
-            ).execute()
+def update_user_base_work_days(user_name: str, new_base_days: int):
+    """UserMaster 시트의 base_work_days(C열)를 업데이트합니다.
+
+    행 번호는 UserMaster 인덱스에서 바로 찾고, 쓰기가 성공하면 캐시에도 반영합니다.
+    """
+    try:
+        row_index = _resolve_user_row(user_name)
+        if row_index is None:
+            logging.warning(f"[update_user_base_work_days] 사용자 '{user_name}' 찾을 수 없음")
+            return False
 
-            logging.info(f"[update_user_base_work_days] {user_name}: base_work_days → {new_base_days}")
-            return True
+        with _get_base_days_lock(user_name):
+            _write_base_work_days(row_index, new_base_days)
 
-        return execute_with_retry(_task)
+        logging.info(f"[update_user_base_work_days] {user_name}: base_work_days → {new_base_days}")
+        return True
     except Exception as e:
         logging.exception(f"Error updating base_work_days for {user_name}: {e}")
         return False
 
 
+# 사용자별 base_work_days 갱신 잠금 (같은 사용자의 동시 증가를 직렬화)
+_base_days_locks: Dict[str, threading.Lock] = {}
+_base_days_locks_guard = threading.Lock()
+
+
+def _get_base_days_lock(user_name: str) -> threading.Lock:
+    key = user_name.strip()
+    with _base_days_locks_guard:
+        lock = _base_days_locks.get(key)
+        if lock is None:
+            lock = _base_days_locks[key] = threading.Lock()
+        return lock
+
+
+def _read_user_row_cells(row_index: int) -> list:
+    """UserMaster의 한 행(A~C열)만 읽습니다. [이름, Slack_ID, base_work_days]"""
+    def _task():
+        service = _build_service()
+        resp = service.spreadsheets().values().get(
+            spreadsheetId=SPREADSHEET_KEY,
+            range=f"UserMaster!A{row_index}:C{row_index}"
+        ).execute()
+        values = resp.get("values", [])
+        return values[0] if values else []
+
+    return execute_with_retry(_task)
+
+
+def increment_user_base_work_days(user_name: str, delta: int = 1):
+    """base_work_days(C열)를 delta만큼 증가시키고 (이전 값, 새 값)을 반환합니다.
+
+    같은 사용자에 대한 증가는 사용자별 잠금으로 직렬화합니다. 캐시된 행 번호로
+    해당 행만 새로 읽어 이름이 그대로인지 확인(행이 밀렸으면 인덱스를 다시 만듦)한 뒤,
+    최신 값 + delta를 한 번 씁니다. 쓰는 값은 재시도 전에 확정되므로 API 재시도로
+    하루가 두 번 더해지지 않습니다.
+
+    Returns:
+        (prev_days, new_days) 또는 실패 시 None
+    """
+    name_key = user_name.strip()
+    try:
+        with _get_base_days_lock(name_key):
+            row_index = _resolve_user_row(name_key)
+            cells = _read_user_row_cells(row_index) if row_index else []
+
+            # 행이 바뀌었으면(행 삽입/삭제) 인덱스를 새로 읽어 한 번 더 확인
+            if row_index is None or not cells or cells[0].strip() != name_key:
+                invalidate_user_master_cache()
+                row_index = _resolve_user_row(name_key)
+                cells = _read_user_row_cells(row_index) if row_index else []
+                if row_index is None or not cells or cells[0].strip() != name_key:
+                    logging.warning(f"[increment_user_base_work_days] 사용자 '{user_name}' 찾을 수 없음")
+                    return None
+
+            prev_days = _parse_user_row(cells, row_index)["base_work_days"]
+            new_days = prev_days + delta
+
+            _write_base_work_days(row_index, new_days)
+
+        logging.info(f"[increment_user_base_work_days] {user_name}: base_work_days {prev_days} → {new_days}")
+        return prev_days, new_days
+    except Exception as e:
+        logging.exception(f"Error incrementing base_work_days for {user_name}: {e}")
+        return None
+
+
 # ----------------------------------------------------
 # 4. 레벨 계산
 # ----------------------------------------------------
@@ -482,34 +1490,8 @@ def get_monthly_work_count(user_name, year, month):
     특정 월의 근무일수를 계산합니다.
     """
     try:
-        def _task():
-            service = _build_service()
-            resp = service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="AttendanceLog!A:E"
-            ).execute()
-            all_values = resp.get("values", [])
-            if len(all_values) < 2:
-                return 0
-
-            headers = all_values[0]
-            date_idx = headers.index("날짜") if "날짜" in headers else 0
-            name_idx = headers.index("이름") if "이름" in headers else 1
-            type_idx = headers.index("구분") if "구분" in headers else 3
-
-            work_dates = []
-            target_month = f"{year}-{month:02d}"
-
-            for row in all_values[1:]:
-                if len(row) > date_idx and len(row) > name_idx and len(row) > type_idx:
-                    if row[name_idx] == user_name and row[type_idx] == "출근":
-                        date_str = row[date_idx]
-                        if date_str.startswith(target_month):
-                            work_dates.append(date_str)
-
-            return len(set(work_dates))
-
-        return execute_with_retry(_task)
+        target_month = f"{year}-{month:02d}"
+        return len(_get_attendance_index().get(user_name, {}).get(target_month, []))
     except Exception as e:
         logging.exception(f"Error getting monthly work count for {user_name}: {e}")
         return 0
@@ -549,111 +1531,142 @@ def calculate_monthly_payroll(user_name, year, month):
     반환: (total_pay, work_days, daily_pay_breakdown)
     """
     try:
-        def _task():
-            service = _build_service()
-            resp = service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="AttendanceLog!A:E"
-            ).execute()
-            all_values = resp.get("values", [])
-            if len(all_values) < 2:
-                return 0, 0, []
-
-            headers = all_values[0]
-            date_idx = headers.index("날짜") if "날짜" in headers else 0
-            name_idx = headers.index("이름") if "이름" in headers else 1
-            type_idx = headers.index("구분") if "구분" in headers else 3
-
-            work_dates = []
-            target_month = f"{year}-{month:02d}"
-
-            for row in all_values[1:]:
-                if len(row) > date_idx and len(row) > name_idx and len(row) > type_idx:
-                    if row[name_idx] == user_name and row[type_idx] == "출근":
-                        date_str = row[date_idx]
-                        if date_str.startswith(target_month):
-                            work_dates.append(date_str)
-
-            if not work_dates:
-                return 0, 0, []
-
-            user_info = get_user_info(user_name)
-            base_days = user_info.get("base_work_days", 0) if user_info else 0
-            user_type = user_info.get("user_type", "정규직") if user_info else "정규직"
-
-            previous_work_dates = set()
-
-            for row in all_values[1:]:
-                if len(row) > date_idx and len(row) > name_idx and len(row) > type_idx:
-                    if row[name_idx] == user_name and row[type_idx] == "출근":
-                        date_str = row[date_idx]
-                        if date_str < target_month:
-                            previous_work_dates.add(date_str)
-
-            previous_days = base_days + len(previous_work_dates)
-
-            total_pay = 0
-            daily_breakdown = []
-            work_dates_sorted = sorted(set(work_dates))
-
-            for work_date in work_dates_sorted:
-                current_total_days = previous_days + work_dates_sorted.index(work_date) + 1
-                daily_pay = calculate_daily_pay(current_total_days, user_type)
-                total_pay += daily_pay
-                daily_breakdown.append({
-                    "date": work_date,
-                    "cumulative_days": current_total_days,
-                    "daily_pay": daily_pay
-                })
-
-            return total_pay, len(work_dates_sorted), daily_breakdown
+        target_month = f"{year}-{month:02d}"
+        months = _get_attendance_index().get(user_name, {})  # 읽기 전용이라 복사하지 않음
+        if not months.get(target_month):
+            return 0, 0, []
 
-        return execute_with_retry(_task)
+        user_info = get_user_info(user_name)
+        base_days = user_info.get("base_work_days", 0) if user_info else 0
+        user_type = user_info.get("user_type", "정규직") if user_info else "정규직"
+
+        return _monthly_payroll_from_index(months, base_days, user_type, target_month)
     except Exception as e:
         return 0, 0, []
 
+
+def _monthly_payroll_from_index(months, base_days, user_type, target_month):
+    """월별 출근 인덱스로 한 사람의 월급을 계산합니다.
+
+    이전 달까지의 누적 근무일수는 월별 날짜 개수의 합으로 구하고,
+    이번 달 날짜는 한 번만 순회하면서 누적일수와 계단식 일당을 함께 계산합니다.
+    (몇 년치 기록이 쌓여도 월 개수 + 이번 달 근무일수만큼만 처리)
+
+    Args:
+        months: {"YYYY-MM": [정렬된 고유 출근 날짜]} (get_user_attendance_months 결과)
+        base_days: UserMaster의 base_work_days
+        user_type: "정규직" 또는 "교육생"
+        target_month: "YYYY-MM"
+
+    Returns:
+        tuple: (total_pay, work_days, daily_breakdown)
+    """
+    work_dates_sorted = months.get(target_month, [])
+    if not work_dates_sorted:
+        return 0, 0, []
+
+    previous_days = base_days
+    for month_key, dates in months.items():
+        if month_key < target_month:
+            previous_days += len(dates)
+
+    total_pay = 0
+    daily_breakdown = []
+
+    for current_total_days, work_date in enumerate(work_dates_sorted, start=previous_days + 1):
+        daily_pay = calculate_daily_pay(current_total_days, user_type)
+        total_pay += daily_pay
+        daily_breakdown.append({
+            "date": work_date,
+            "cumulative_days": current_total_days,
+            "daily_pay": daily_pay
+        })
+
+    return total_pay, len(work_dates_sorted), daily_breakdown
+
 # ----------------------------------------------------
 # 12. 인센티브 조회
 # ----------------------------------------------------
-def get_commission(user_name, year, month):
-    """
-    특정 월의 인센티브(격려금) 총액을 조회합니다.
-    Incentive 시트가 없으면 조용히 0을 반환합니다.
-    """
+def _fetch_incentive_values():
+    """Incentive 시트 전체 값을 읽어옵니다. 시트가 없으면 None을 반환합니다."""
     try:
-        service = _build_service()
-        try:
+        with _google_clients():
+            service = _build_service()
             resp = service.spreadsheets().values().get(
                 spreadsheetId=SPREADSHEET_KEY,
                 range="Incentive!A:F"
             ).execute()
-        except Exception:
-            # Incentive 시트가 없으면 조용히 0 반환 (로그 없음)
-            return 0
+    except Exception:
+        # Incentive 시트가 없으면 조용히 None 반환 (로그 없음)
+        return None
+    return resp.get("values", [])
+
+
+def _build_incentive_index(all_values):
+    """Incentive 원본 값으로 {이름: {"YYYY-MM": [{"date", "amount", "description"}]}} 인덱스를 만듭니다."""
+    if not all_values or len(all_values) < 2:
+        return {}
+
+    headers = all_values[0]
+    date_idx = headers.index("날짜") if "날짜" in headers else 0
+    name_idx = headers.index("이름") if "이름" in headers else 1
+    amount_idx = headers.index("금액") if "금액" in headers else 2
+    description_idx = headers.index("내용") if "내용" in headers else 3
+
+    index = {}
+    for row in all_values[1:]:
+        if len(row) > date_idx and len(row) > name_idx and len(row) > amount_idx:
+            try:
+                amount = int(float(row[amount_idx]))
+            except (ValueError, IndexError):
+                continue
+            date_str = row[date_idx]
+            months = index.setdefault(row[name_idx], {})
+            months.setdefault(date_str[:7], []).append({
+                "date": date_str,
+                "amount": amount,
+                "description": row[description_idx] if len(row) > description_idx else ""
+            })
 
-        all_values = resp.get("values", [])
-        if len(all_values) < 2:
-            return 0
+    return index
 
-        headers = all_values[0]
-        date_idx = headers.index("날짜") if "날짜" in headers else 0
-        name_idx = headers.index("이름") if "이름" in headers else 1
-        amount_idx = headers.index("금액") if "금액" in headers else 2
 
-        total = 0
-        target_month = f"{year}-{month:02d}"
+def _commission_from_index(incentive_index, user_name, target_month):
+    """인센티브 인덱스에서 한 사람의 월 인센티브 총액과 날짜별 상세 내역을 계산합니다.
+
+    Returns:
+        tuple: (total, [{"date": str, "total": int, "items": [{"description": str, "amount": int}]}, ...])
+    """
+    total = 0
+    details_by_date = {}
+
+    for entry in incentive_index.get(user_name, {}).get(target_month, []):
+        date_str = entry["date"]
+        if date_str not in details_by_date:
+            details_by_date[date_str] = {
+                "date": date_str,
+                "total": 0,
+                "items": []
+            }
 
-        for row in all_values[1:]:
-            if len(row) > date_idx and len(row) > name_idx and len(row) > amount_idx:
-                if row[name_idx] == user_name:
-                    date_str = row[date_idx]
-                    if date_str.startswith(target_month):
-                        try:
-                            amount = int(float(row[amount_idx]))
-                            total += amount
-                        except (ValueError, IndexError):
-                            continue
+        total += entry["amount"]
+        details_by_date[date_str]["total"] += entry["amount"]
+        details_by_date[date_str]["items"].append({
+            "description": entry["description"],
+            "amount": entry["amount"]
+        })
 
+    return total, list(details_by_date.values())
+
+
+def get_commission(user_name, year, month):
+    """
+    특정 월의 인센티브(격려금) 총액을 조회합니다.
+    Incentive 시트가 없으면 조용히 0을 반환합니다.
+    """
+    try:
+        incentive_index = _build_incentive_index(_fetch_incentive_values())
+        total, _ = _commission_from_index(incentive_index, user_name, f"{year}-{month:02d}")
         return total
     except Exception:
         # 에러 로그 없이 0 반환
@@ -667,54 +1680,9 @@ def get_commission_details(user_name, year, month):
     반환: [{"date": str, "total": int, "items": [{"description": str, "amount": int}]}, ...]
     """
     try:
-        service = _build_service()
-        try:
-            resp = service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="Incentive!A:F"
-            ).execute()
-        except Exception:
-            # Incentive 시트가 없으면 조용히 빈 배열 반환 (로그 없음)
-            return []
-
-        all_values = resp.get("values", [])
-        if len(all_values) < 2:
-            return []
-
-        headers = all_values[0]
-        date_idx = headers.index("날짜") if "날짜" in headers else 0
-        name_idx = headers.index("이름") if "이름" in headers else 1
-        amount_idx = headers.index("금액") if "금액" in headers else 2
-        description_idx = headers.index("내용") if "내용" in headers else 3
-
-        details_by_date = {}
-        target_month = f"{year}-{month:02d}"
-
-        for row in all_values[1:]:
-            if len(row) > date_idx and len(row) > name_idx and len(row) > amount_idx:
-                if row[name_idx] == user_name:
-                    date_str = row[date_idx]
-                    if date_str.startswith(target_month):
-                        try:
-                            amount = int(float(row[amount_idx]))
-                            description = row[description_idx] if len(row) > description_idx else ""
-
-                            if date_str not in details_by_date:
-                                details_by_date[date_str] = {
-                                    "date": date_str,
-                                    "total": 0,
-                                    "items": []
-                                }
-
-                            details_by_date[date_str]["total"] += amount
-                            details_by_date[date_str]["items"].append({
-                                "description": description,
-                                "amount": amount
-                            })
-                        except (ValueError, IndexError):
-                            continue
-
-        return list(details_by_date.values())
+        incentive_index = _build_incentive_index(_fetch_incentive_values())
+        _, details = _commission_from_index(incentive_index, user_name, f"{year}-{month:02d}")
+        return details
     except Exception:
         # 에러 로그 없이 빈 배열 반환
         return []
@@ -829,64 +1797,41 @@ def get_user_info(user_key):
         dict: {"name": str, "base_work_days": int, "user_type": str, "address": str} 또는 None
     """
     try:
-        def _task():
-            service = _build_service()
-            resp = service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="UserMaster!A:G"  # A: 이름, B: Slack_ID, C: 기본근무일수, D: 구분(사용자타입), F: 주소
-            ).execute()
-            all_values = resp.get("values", [])
-            if len(all_values) < 2:
-                return None
-
-            # 헤더 제외
-            for row in all_values[1:]:
-                if len(row) >= 2:
-                    name = row[0].strip() if len(row) > 0 else ""  # A열: 이름
-                    slack_id = row[1].strip() if len(row) > 1 else ""  # B열: Slack_ID
-                    base_days = 0
-                    user_type = "정규직"  # 기본값
-                    address = ""
-                    
-                    # 기본근무일수 (C열)
-                    if len(row) > 2 and row[2]:
-                        try:
-                            base_days = int(float(row[2]))
-                        except (ValueError, TypeError):
-                            base_days = 0
-                    
-                    # 사용자 타입 (D열: "정규직" 또는 "교육생")
-                    if len(row) > 3 and row[3]:
-                        user_type = row[3].strip()
-                    
-                    # 주소 (F열)
-                    if len(row) > 5 and row[5]:
-                        address = row[5].strip()
-                    
-                    # Slack_ID 또는 이름으로 매칭
-                    if slack_id and slack_id == user_key:
-                        return {
-                            "name": name,
-                            "base_work_days": base_days,
-                            "user_type": user_type,
-                            "address": address
-                        }
-                    elif name and name == user_key:
-                        return {
-                            "name": name,
-                            "base_work_days": base_days,
-                            "user_type": user_type,
-                            "address": address
-                        }
-            
+        user = _find_user(user_key)
+        if user is None:
             return None
 
-        return execute_with_retry(_task)
+        return {
+            "name": user["name"],
+            "base_work_days": user["base_work_days"],
+            "user_type": user["user_type"],
+            "address": user["address"]
+        }
     except Exception as e:
         logging.exception(f"Error getting user info for {user_key}: {e}")
         return None
 
 
+def peek_user_info(user_key):
+    """시트를 읽지 않고 메모리의 UserMaster 캐시(만료됐어도)에서만 사용자 정보를 찾습니다.
+
+    응답 시간 제한 안에 조회가 끝나지 않았을 때 쓰는 대체 조회입니다. 캐시가 없으면 None.
+    """
+    with _user_master_lock:
+        table = _user_table
+    if table is None:
+        return None
+    user = _find_user(user_key, table)
+    if user is None:
+        return None
+    return {
+        "name": user["name"],
+        "base_work_days": user["base_work_days"],
+        "user_type": user["user_type"],
+        "address": user["address"]
+    }
+
+
 def get_all_users():
     """
     UserMaster 시트에서 모든 사용자 목록을 조회합니다.
@@ -895,56 +1840,18 @@ def get_all_users():
         List[Dict]: [{"name": str, "slack_id": str, "base_work_days": int, "user_type": str, "address": str}, ...]
     """
     try:
-        def _task():
-            service = _build_service()
-            resp = service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="UserMaster!A:G"  # A: 이름, B: Slack_ID, C: 기본근무일수, D: 구분(사용자타입), F: 주소
-            ).execute()
-            all_values = resp.get("values", [])
-            if len(all_values) < 2:
-                return []
-            
-            users = []
-            # 헤더 제외
-            for row in all_values[1:]:
-                if len(row) >= 2:
-                    name = row[0].strip() if len(row) > 0 else ""
-                    slack_id = row[1].strip() if len(row) > 1 else ""
-                    
-                    if not name:  # 이름이 없으면 건너뛰기
-                        continue
-                    
-                    base_days = 0
-                    user_type = "정규직"  # 기본값
-                    address = ""
-                    
-                    # 기본근무일수 (C열)
-                    if len(row) > 2 and row[2]:
-                        try:
-                            base_days = int(float(row[2]))
-                        except (ValueError, TypeError):
-                            base_days = 0
-                    
-                    # 사용자 타입 (D열: "정규직" 또는 "교육생")
-                    if len(row) > 3 and row[3]:
-                        user_type = row[3].strip()
-                    
-                    # 주소 (F열)
-                    if len(row) > 5 and row[5]:
-                        address = row[5].strip()
-                    
-                    users.append({
-                        "name": name,
-                        "slack_id": slack_id,
-                        "base_work_days": base_days,
-                        "user_type": user_type,
-                        "address": address
-                    })
-            
-            return users
-        
-        return execute_with_retry(_task)
+        users = []
+        for user in _get_user_table()["users"]:
+            if not user["name"]:  # 이름이 없으면 건너뛰기
+                continue
+            users.append({
+                "name": user["name"],
+                "slack_id": user["slack_id"],
+                "base_work_days": user["base_work_days"],
+                "user_type": user["user_type"],
+                "address": user["address"]
+            })
+        return users
     except Exception as e:
         logging.exception(f"Error getting all users: {e}")
         return []
@@ -953,27 +1860,36 @@ def get_all_users():
 def calculate_all_payrolls(year, month):
     """
     모든 사용자의 급여를 계산합니다.
+
+    UserMaster, AttendanceLog, Incentive를 한 번씩만 읽고 (batchGet 1회)
+    모든 직원의 급여를 메모리에서 계산합니다. 읽어온 값으로 캐시도 갱신합니다.
     
     Args:
         year: 연도
         month: 월
     
     Returns:
-        List[Dict]: [{"name": str, "slack_id": str, "work_days": int, "base_pay": int, 
-                     "commission": int, "transportation": int, "total_pay": int}, ...]
+        List[Dict]: [{"name": str, "slack_id": str, "work_days": int, "work_dates": List[int],
+                     "base_pay": int, "commission": int, "commission_details": List[Dict],
+                     "transportation": int, "total_pay": int, "total_work_days": int}, ...]
     """
     try:
-        users = get_all_users()
-        if not users:
-            return []
-        
+        tables = batch_get_tables(["UserMaster", "AttendanceLog", "Incentive"])
+        user_table = tables["UserMaster"]
+        attendance_index = tables["AttendanceLog"]
+        incentive_index = tables["Incentive"]
+
+        target_month = f"{year}-{month:02d}"
         payrolls = []
-        for user in users:
+        for user in user_table["users"]:
             name = user["name"]
-            slack_id = user["slack_id"]
-            
+            if not name:  # 이름이 없으면 건너뛰기
+                continue
+
             # 기본 급여 계산
-            base_pay, work_days, daily_breakdown = calculate_monthly_payroll(name, year, month)
+            base_pay, work_days, daily_breakdown = _monthly_payroll_from_index(
+                attendance_index.get(name, {}), user["base_work_days"], user["user_type"], target_month
+            )
 
             # 근무일이 0이면 건너뛰기
             if work_days == 0:
@@ -983,7 +1899,7 @@ def calculate_all_payrolls(year, month):
             work_dates = sorted([int(item["date"].split("-")[2]) for item in daily_breakdown])
 
             # 인센티브 계산
-            commission = get_commission(name, year, month)
+            commission, commission_details = _commission_from_index(incentive_index, name, target_month)
 
             # 교통비 계산
             transportation = calculate_transportation_allowance(work_days)
@@ -993,13 +1909,15 @@ def calculate_all_payrolls(year, month):
 
             payrolls.append({
                 "name": name,
-                "slack_id": slack_id,
+                "slack_id": user["slack_id"],
                 "work_days": work_days,
                 "work_dates": work_dates,
                 "base_pay": base_pay,
                 "commission": commission,
+                "commission_details": commission_details,
                 "transportation": transportation,
-                "total_pay": total_pay
+                "total_pay": total_pay,
+                "total_work_days": user["base_work_days"]
             })
         
         return payrolls
@@ -1025,29 +1943,15 @@ def record_material_usage(user_name: str, room: str, color: str, quantity: float
         (success: bool, message: str)
     """
     try:
-        def _task():
-            service = _build_service()
-            now_kst = datetime.now(KST)
-            body = {
-                "values": [[
-                    now_kst.strftime("%Y-%m-%d %H:%M:%S"),  # 날짜시간
-                    user_name,                             # 이름
-                    room,                                  # 방 이름
-                    color,                                 # 색상 코드
-                    quantity,                              # 사용량
-                    site_address                           # 현장 주소
-                ]]
-            }
-            request = service.spreadsheets().values().append(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="MaterialLog!A:F",
-                valueInputOption="USER_ENTERED",
-                insertDataOption="INSERT_ROWS",
-                body=body
-            )
-            return request.execute()
-
-        execute_with_retry(_task)
+        now_kst = datetime.now(KST)
+        _append_row("MaterialLog!A:F", [
+            now_kst.strftime("%Y-%m-%d %H:%M:%S"),  # 날짜시간
+            user_name,                             # 이름
+            room,                                  # 방 이름
+            color,                                 # 색상 코드
+            quantity,                              # 사용량
+            site_address                           # 현장 주소
+        ])
         return True, "자재 사용량이 정상적으로 저장되었습니다."
     except Exception as e:
         return False, f"자재 기록 오류: {str(e)}"
@@ -1064,26 +1968,12 @@ def record_material_order(user_name: str, order_text: str):
         (success: bool, message: str)
     """
     try:
-        def _task():
-            service = _build_service()
-            now_kst = datetime.now(KST)
-            body = {
-                "values": [[
-                    now_kst.strftime("%Y-%m-%d %H:%M:%S"),
-                    user_name,
-                    order_text
-                ]]
-            }
-            request = service.spreadsheets().values().append(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="MaterialOrder!A:C",  # 날짜시간, 이름, 발주내용
-                valueInputOption="USER_ENTERED",
-                insertDataOption="INSERT_ROWS",
-                body=body
-            )
-            return request.execute()
-
-        execute_with_retry(_task)
+        now_kst = datetime.now(KST)
+        _append_row("MaterialOrder!A:C", [  # 날짜시간, 이름, 발주내용
+            now_kst.strftime("%Y-%m-%d %H:%M:%S"),
+            user_name,
+            order_text
+        ])
         return True, "발주 내용이 정상적으로 저장되었습니다."
     except Exception as e:
         return False, f"발주 기록 오류: {str(e)}"
@@ -1101,21 +1991,11 @@ def get_pending_material_orders(year: int = None, month: int = None):
         orders: [{"row_index": int, "date": str, "name": str, "content": str}, ...]
     """
     try:
-        # 외부 스코프에서 미리 값을 할당 (중첩 함수에서 참조하기 위해)
         now_kst = datetime.now(KST)
         target_year = year if year is not None else now_kst.year
         target_month = month if month is not None else now_kst.month
         
-        def _task():
-            service = _build_service()
-            
-            # MaterialOrder 시트 전체 조회
-            resp = service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_KEY,
-                range="MaterialOrder!A:D"  # 날짜시간, 이름, 발주내용, 발주완료 처리시간
-            ).execute()
-            
-            all_values = resp.get("values", [])
+        def _collect_pending(all_values):
             if len(all_values) < 2:  # 헤더만 있거나 없음
                 return []
             
@@ -1151,7 +2031,8 @@ def get_pending_material_orders(year: int = None, month: int = None):
             
             return orders
         
-        orders = execute_with_retry(_task)
+        # MaterialOrder 시트 전체 조회 (batchGet 경로 사용, 재시도 포함)
+        orders = _collect_pending(batch_get_values(["MaterialOrder"])["MaterialOrder"])
         return True, orders
     except Exception as e:
         return False, f"발주 목록 조회 오류: {str(e)}"
@@ -1159,6 +2040,10 @@ def get_pending_material_orders(year: int = None, month: int = None):
 
 def mark_orders_completed(row_indices: List[int]):
     """발주 완료 처리 (발주완료 처리시간 업데이트)
+
+    모든 행의 D열을 values.batchUpdate 한 번으로 기록합니다.
+    요청 하나로 처리되므로 일부 행만 반영되는 일이 없고,
+    재시도해도 같은 처리시간을 다시 쓰므로 결과가 같습니다.
     
     Args:
         row_indices: 완료 처리할 행 번호 리스트 (시트의 실제 행 번호, 1-based)
@@ -1167,51 +2052,35 @@ def mark_orders_completed(row_indices: List[int]):
         (success: bool, message: str)
     """
     try:
+        unique_rows = sorted(set(row_indices))
+        if not unique_rows:
+            return True, "0건의 발주가 완료 처리되었습니다."
+
+        now_kst = datetime.now(KST)
+        completed_time = now_kst.strftime("%Y-%m-%d %H:%M:%S")
+
+        # 각 행의 D열에 처리시간 업데이트
+        body = {
+            "valueInputOption": "USER_ENTERED",
+            "data": [
+                {"range": f"MaterialOrder!D{row_idx}", "values": [[completed_time]]}
+                for row_idx in unique_rows
+            ]
+        }
+
         def _task():
             service = _build_service()
-            now_kst = datetime.now(KST)
-            completed_time = now_kst.strftime("%Y-%m-%d %H:%M:%S")
-            
-            # 각 행의 D열에 처리시간 업데이트
-            for row_idx in row_indices:
-                range_name = f"MaterialOrder!D{row_idx}"
-                body = {
-                    "values": [[completed_time]]
-                }
-                service.spreadsheets().values().update(
-                    spreadsheetId=SPREADSHEET_KEY,
-                    range=range_name,
-                    valueInputOption="USER_ENTERED",
-                    body=body
-                ).execute()
-            
-            return True
-        
+            return service.spreadsheets().values().batchUpdate(
+                spreadsheetId=SPREADSHEET_KEY,
+                body=body
+            ).execute()
+
         execute_with_retry(_task)
-        return True, f"{len(row_indices)}건의 발주가 완료 처리되었습니다."
+        return True, f"{len(unique_rows)}건의 발주가 완료 처리되었습니다."
     except Exception as e:
         return False, f"발주 완료 처리 오류: {str(e)}"
 
 
-def _build_drive_service():
-    """Google Drive API 서비스를 싱글톤으로 반환합니다."""
-    global _drive_service
-    if _drive_service is not None:
-        return _drive_service
-
-    json_str = os.environ.get("GCF_CREDENTIALS")
-    if not json_str:
-        raise ValueError("GCF_CREDENTIALS 환경 변수가 설정되지 않았습니다.")
-
-    credentials_dict = json.loads(json_str)
-    creds = service_account.Credentials.from_service_account_info(
-        credentials_dict,
-        scopes=DRIVE_SCOPES
-    )
-    _drive_service = build("drive", "v3", credentials=creds, cache_discovery=False)
-    return _drive_service
-
-
 def create_site_photo_folder(site_address: str):
     """
     현장 사진 폴더를 Google Drive에 생성합니다.
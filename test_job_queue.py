@@ -0,0 +1,158 @@
+# test_job_queue.py (작업 큐 중단/재전달 테스트: python -m unittest test_job_queue)
+
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+
+import local_store
+import job_queue
+import worker_main
+
+
+class RedeliveryTest(unittest.TestCase):
+    """키를 선점한 뒤 기록 전에 죽은 작업이 다시 전달돼도 출퇴근이 사라지지 않는지 확인합니다."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = {
+            (local_store, "LOCAL_DB_PATH"): local_store.LOCAL_DB_PATH,
+            (local_store, "IDEMPOTENCY_STALE_SECONDS"): local_store.IDEMPOTENCY_STALE_SECONDS,
+            (local_store, "_local"): local_store._local,
+            (job_queue, "JOB_QUEUE_BACKEND"): job_queue.JOB_QUEUE_BACKEND,
+            (job_queue, "JOB_QUEUE_WORKERS"): job_queue.JOB_QUEUE_WORKERS,
+            (job_queue, "JOB_QUEUE_POLL_INTERVAL"): job_queue.JOB_QUEUE_POLL_INTERVAL,
+            (worker_main, "_handle_check_out"): worker_main._handle_check_out,
+            (worker_main, "_send_slack_ephemeral"): worker_main._send_slack_ephemeral,
+        }
+        local_store.LOCAL_DB_PATH = os.path.join(self._tmp.name, "test.sqlite3")
+        local_store._local = threading.local()
+        local_store.IDEMPOTENCY_STALE_SECONDS = 0.5
+        job_queue.JOB_QUEUE_BACKEND = "sqlite"
+        job_queue.JOB_QUEUE_WORKERS = 1
+        job_queue.JOB_QUEUE_POLL_INTERVAL = 0.05
+
+        self.handled = []
+
+        def _fake_check_out(user_id, user_name, channel_id, idempotency_key=None):
+            self.handled.append(user_name)
+            local_store.complete_idempotency_key(idempotency_key)
+
+        worker_main._handle_check_out = _fake_check_out
+        self.notices = []
+        worker_main._send_slack_ephemeral = lambda channel, user, text: self.notices.append((channel, user, text))
+        self.payload = {
+            "action": "check_out",
+            "user_id": "U1",
+            "user_name": "홍길동",
+            "channel_id": "C1",
+            "idempotency_key": "check_out:U1:2026-01-01",
+        }
+
+    def tearDown(self):
+        job_queue.drain(timeout=5)
+        for (module, name), value in self._saved.items():
+            setattr(module, name, value)
+        self._tmp.cleanup()
+
+    def _simulate_crash(self):
+        """작업과 키를 가져간 뒤 시트 기록 전에 프로세스가 죽은 상황을 만듭니다."""
+        local_store.enqueue_job(json.dumps(self.payload, ensure_ascii=False))
+        self.assertIsNotNone(local_store.claim_job(visibility_timeout=0.2))
+        self.assertTrue(local_store.claim_idempotency_key(self.payload["idempotency_key"]))
+        time.sleep(0.25)  # 가시성 타임아웃이 지나 다시 전달 가능
+
+    def test_redelivery_while_key_running_is_deferred(self):
+        self._simulate_crash()
+
+        job_id, raw_payload, _ = local_store.claim_job(visibility_timeout=0.2)
+        with self.assertRaises(worker_main.DuplicateInFlight):
+            worker_main.process_task(json.loads(raw_payload))
+
+        self.assertEqual(self.handled, [])
+        self.assertEqual(local_store.count_jobs(), 1)  # 작업이 삭제되지 않음
+
+    def test_redelivered_job_is_processed_once_key_turns_stale(self):
+        self._simulate_crash()
+
+        job_queue.start(worker_main.process_task)
+        deadline = time.monotonic() + 10
+        while not self.handled and time.monotonic() < deadline:
+            time.sleep(0.05)
+        job_queue.drain(timeout=5)
+
+        self.assertEqual(self.handled, ["홍길동"])
+        self.assertEqual(local_store.count_jobs(), 0)
+        dead = local_store.get_connection().execute("SELECT COUNT(*) FROM dead_jobs").fetchone()[0]
+        self.assertEqual(dead, 0)
+        status = local_store.get_idempotency_key(self.payload["idempotency_key"])
+        self.assertEqual(status[0], "done")
+
+    def test_completed_key_is_skipped(self):
+        self.assertTrue(local_store.claim_idempotency_key(self.payload["idempotency_key"]))
+        local_store.complete_idempotency_key(self.payload["idempotency_key"])
+
+        worker_main.process_task(dict(self.payload))
+
+        self.assertEqual(self.handled, [])
+        self.assertEqual(len(self.notices), 1)
+        self.assertEqual(self.notices[0][:2], ("C1", "U1"))
+        self.assertIn("이미 퇴근이 기록", self.notices[0][2])
+
+
+class CheckOutOrderingTest(unittest.TestCase):
+    """근무일수 증가가 끝나기 전에는 퇴근 키가 완료되지 않고, 재시도 때 퇴근 기록이 중복되지 않는지 확인합니다."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = {
+            (local_store, "LOCAL_DB_PATH"): local_store.LOCAL_DB_PATH,
+            (local_store, "_local"): local_store._local,
+        }
+        for name in ("get_user_info", "record_check_out", "increment_user_base_work_days"):
+            self._saved[(worker_main.sheets_handler, name)] = getattr(worker_main.sheets_handler, name)
+        for name in ("_send_slack", "_send_slack_with_buttons"):
+            self._saved[(worker_main, name)] = getattr(worker_main, name)
+        local_store.LOCAL_DB_PATH = os.path.join(self._tmp.name, "test.sqlite3")
+        local_store._local = threading.local()
+
+        self.appended = []
+        self.increment_results = []
+        self.sent = []
+        sheets = worker_main.sheets_handler
+        sheets.get_user_info = lambda key: {"name": "홍길동", "user_type": "정규직", "address": ""}
+        sheets.record_check_out = lambda name: (self.appended.append(name), (True, "ok"))[1]
+        sheets.increment_user_base_work_days = lambda name: self.increment_results.pop(0)
+        worker_main._send_slack = lambda channel, text: self.sent.append(text)
+        worker_main._send_slack_with_buttons = lambda channel, text, home_address="": self.sent.append(text)
+        self.payload = {
+            "action": "check_out",
+            "user_id": "U1",
+            "user_name": "홍길동",
+            "channel_id": "C1",
+            "idempotency_key": "check_out:U1:2026-01-01",
+        }
+
+    def tearDown(self):
+        for (module, name), value in self._saved.items():
+            setattr(module, name, value)
+        self._tmp.cleanup()
+
+    def test_key_is_completed_only_after_increment(self):
+        self.increment_results = [None, (10, 11)]
+
+        with self.assertRaises(RuntimeError):
+            worker_main.process_task(dict(self.payload))
+        self.assertIsNone(local_store.get_idempotency_key(self.payload["idempotency_key"]))
+        self.assertEqual(self.sent, [])
+
+        worker_main.process_task(dict(self.payload))
+        self.assertEqual(self.appended, ["홍길동"])  # 재시도 때 퇴근 기록은 다시 쓰지 않음
+        self.assertEqual(local_store.get_idempotency_key(self.payload["idempotency_key"])[0], "done")
+        self.assertEqual(len(self.sent), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,375 @@
+# test_sheets_handler.py (시트 읽기/쓰기 최적화 회귀 테스트: python -m unittest test_sheets_handler)
+
+import os
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from googleapiclient.errors import HttpError
+
+import sheets_handler
+
+
+class _FakeResponse(dict):
+    """HttpError가 기대하는 httplib2.Response 대용 (status, reason 속성)."""
+
+    def __init__(self, status: int):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = "Bad Request" if status == 400 else "Error"
+
+
+class _FakeRequest:
+    def __init__(self, func):
+        self._func = func
+
+    def execute(self):
+        return self._func()
+
+
+class _FakeSheetsService:
+    """spreadsheets().values()의 get/batchGet/batchUpdate/update/append만 흉내 내는 가짜 Sheets 서비스.
+
+    없는 시트를 읽으면 실제 API처럼 400 HttpError를 올리고, 호출 내역을 calls에 남깁니다.
+    """
+
+    def __init__(self, sheets: dict):
+        self.sheets = sheets
+        self.calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _read(self, range_name):
+        sheet = range_name.split("!")[0]
+        if sheet not in self.sheets:
+            raise HttpError(_FakeResponse(400), b"{}")
+        return {"range": range_name, "values": self.sheets[sheet]}
+
+    def get(self, spreadsheetId, range):
+        self.calls.append(("get", range))
+        return _FakeRequest(lambda: self._read(range))
+
+    def batchGet(self, spreadsheetId, ranges):
+        self.calls.append(("batchGet", tuple(ranges)))
+        return _FakeRequest(lambda: {"valueRanges": [self._read(range_name) for range_name in ranges]})
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.calls.append(("batchUpdate", body))
+        return _FakeRequest(lambda: {"totalUpdatedCells": len(body["data"])})
+
+    def update(self, spreadsheetId, range, valueInputOption, body):
+        self.calls.append(("update", range, body))
+        return _FakeRequest(lambda: {})
+
+    def append(self, spreadsheetId, range, valueInputOption, insertDataOption, body):
+        self.calls.append(("append", range, body["values"]))
+        return _FakeRequest(lambda: {})
+
+
+# ----------------------------------------------------
+# 기존(인덱스 도입 전) 계산 방식 - 결과 비교용
+# ----------------------------------------------------
+def _baseline_monthly_payroll(all_values, user_name, year, month, base_days, user_type):
+    """AttendanceLog 전체를 사용자마다 다시 훑던 기존 월급 계산 (list.index 포함)."""
+    headers = all_values[0]
+    date_idx = headers.index("날짜") if "날짜" in headers else 0
+    name_idx = headers.index("이름") if "이름" in headers else 1
+    type_idx = headers.index("구분") if "구분" in headers else 3
+
+    work_dates = []
+    target_month = f"{year}-{month:02d}"
+    for row in all_values[1:]:
+        if len(row) > date_idx and len(row) > name_idx and len(row) > type_idx:
+            if row[name_idx] == user_name and row[type_idx] == "출근":
+                if row[date_idx].startswith(target_month):
+                    work_dates.append(row[date_idx])
+    if not work_dates:
+        return 0, 0, []
+
+    previous_work_dates = set()
+    for row in all_values[1:]:
+        if len(row) > date_idx and len(row) > name_idx and len(row) > type_idx:
+            if row[name_idx] == user_name and row[type_idx] == "출근":
+                if row[date_idx] < target_month:
+                    previous_work_dates.add(row[date_idx])
+    previous_days = base_days + len(previous_work_dates)
+
+    total_pay = 0
+    daily_breakdown = []
+    work_dates_sorted = sorted(set(work_dates))
+    for work_date in work_dates_sorted:
+        current_total_days = previous_days + work_dates_sorted.index(work_date) + 1
+        daily_pay = sheets_handler.calculate_daily_pay(current_total_days, user_type)
+        total_pay += daily_pay
+        daily_breakdown.append({
+            "date": work_date,
+            "cumulative_days": current_total_days,
+            "daily_pay": daily_pay
+        })
+    return total_pay, len(work_dates_sorted), daily_breakdown
+
+
+def _baseline_commission(all_values, user_name, year, month):
+    """Incentive 시트를 사용자마다 다시 훑던 기존 인센티브 합계."""
+    if not all_values or len(all_values) < 2:
+        return 0
+    headers = all_values[0]
+    date_idx = headers.index("날짜") if "날짜" in headers else 0
+    name_idx = headers.index("이름") if "이름" in headers else 1
+    amount_idx = headers.index("금액") if "금액" in headers else 2
+
+    total = 0
+    target_month = f"{year}-{month:02d}"
+    for row in all_values[1:]:
+        if len(row) > date_idx and len(row) > name_idx and len(row) > amount_idx:
+            if row[name_idx] == user_name and row[date_idx].startswith(target_month):
+                try:
+                    total += int(float(row[amount_idx]))
+                except (ValueError, IndexError):
+                    continue
+    return total
+
+
+def _sample_sheets():
+    """단가 구간 경계(45/60/90일)를 넘는 직원, 중복 출근, 퇴근 행, 미등록 이름을 포함한 시트 값."""
+    user_master = [
+        ["이름", "Slack_ID", "기본근무일수", "구분", "", "주소"],
+        ["홍길동", "U1", "40", "정규직", "", "서울 강남구"],
+        ["김교육", "U2", "50", "교육생"],
+        ["박정규", "U3", "88", "정규직"],
+        ["최휴직", "U4", "10", "정규직"],
+    ]
+    attendance = [["날짜", "이름", "시간", "구분", "비고"]]
+    for name, step in (("홍길동", 2), ("김교육", 3), ("박정규", 1), ("외부인", 5)):
+        for month in ("2025-12", "2026-01", "2026-02"):
+            for day in range(1, 29, step):
+                date_str = f"{month}-{day:02d}"
+                attendance.append([date_str, name, "08:00:00", "출근", "현장"])
+                attendance.append([date_str, name, "18:00:00", "퇴근", ""])
+        attendance.append(["2026-01-03", name, "08:05:00", "출근", "중복"])
+    attendance.append(["2026-01-04", "홍길동"])  # 열이 모자란 행
+    incentive = [
+        ["날짜", "이름", "금액", "내용"],
+        ["2026-01-05", "홍길동", "50000", "야간"],
+        ["2026-01-05", "홍길동", "20000.0", "주말"],
+        ["2026-01-20", "박정규", "30000", "추가"],
+        ["2026-02-01", "홍길동", "abc", "잘못된 금액"],
+        ["2026-02-02", "김교육", "10000", "교육"],
+    ]
+    return {"UserMaster": user_master, "AttendanceLog": attendance, "Incentive": incentive}
+
+
+class _SheetsTestCase(unittest.TestCase):
+    """가짜 Sheets 서비스를 연결하고 캐시를 비운 상태에서 시작합니다."""
+
+    sheets = None
+
+    def setUp(self):
+        self._saved = {
+            "_build_service": sheets_handler._build_service,
+            "APPEND_BUFFER_ENABLED": sheets_handler.APPEND_BUFFER_ENABLED,
+        }
+        self.service = _FakeSheetsService(self.sheets if self.sheets is not None else _sample_sheets())
+        sheets_handler._build_service = lambda: self.service
+        sheets_handler.APPEND_BUFFER_ENABLED = False
+        sheets_handler.invalidate_user_master_cache()
+        sheets_handler.invalidate_attendance_cache()
+
+    def tearDown(self):
+        for name, value in self._saved.items():
+            setattr(sheets_handler, name, value)
+        sheets_handler.invalidate_user_master_cache()
+        sheets_handler.invalidate_attendance_cache()
+
+
+class PayrollBaselineTest(_SheetsTestCase):
+    """인덱스 기반 급여/인센티브 계산이 기존 방식과 같은 결과를 내는지 확인합니다."""
+
+    MONTHS = ((2025, 12), (2026, 1), (2026, 2), (2026, 3))
+
+    def _user_rows(self):
+        return [row for row in self.service.sheets["UserMaster"][1:]]
+
+    def test_monthly_payroll_matches_baseline(self):
+        attendance = self.service.sheets["AttendanceLog"]
+        for row in self._user_rows():
+            user_type = row[3] if len(row) > 3 else "정규직"
+            for year, month in self.MONTHS:
+                with self.subTest(name=row[0], month=month):
+                    expected = _baseline_monthly_payroll(attendance, row[0], year, month, int(row[2]), user_type)
+                    self.assertEqual(sheets_handler.calculate_monthly_payroll(row[0], year, month), expected)
+
+    def test_commission_matches_baseline(self):
+        incentive = self.service.sheets["Incentive"]
+        for row in self._user_rows():
+            for year, month in self.MONTHS:
+                with self.subTest(name=row[0], month=month):
+                    self.assertEqual(
+                        sheets_handler.get_commission(row[0], year, month),
+                        _baseline_commission(incentive, row[0], year, month),
+                    )
+
+    def test_all_payrolls_match_baseline(self):
+        attendance = self.service.sheets["AttendanceLog"]
+        incentive = self.service.sheets["Incentive"]
+        for year, month in self.MONTHS:
+            expected = []
+            for row in self._user_rows():
+                user_type = row[3] if len(row) > 3 else "정규직"
+                base_pay, work_days, breakdown = _baseline_monthly_payroll(
+                    attendance, row[0], year, month, int(row[2]), user_type
+                )
+                if work_days == 0:
+                    continue
+                commission = _baseline_commission(incentive, row[0], year, month)
+                transportation = sheets_handler.calculate_transportation_allowance(work_days)
+                expected.append({
+                    "name": row[0],
+                    "work_days": work_days,
+                    "work_dates": sorted(int(item["date"].split("-")[2]) for item in breakdown),
+                    "base_pay": base_pay,
+                    "commission": commission,
+                    "total_pay": base_pay + commission + transportation,
+                })
+
+            actual = [
+                {key: payroll[key] for key in ("name", "work_days", "work_dates", "base_pay", "commission", "total_pay")}
+                for payroll in sheets_handler.calculate_all_payrolls(year, month)
+            ]
+            with self.subTest(month=month):
+                self.assertEqual(actual, expected)
+
+        # 세 시트를 batchGet 한 번으로 읽음 (월마다 한 번)
+        batch_calls = [call for call in self.service.calls if call[0] == "batchGet"]
+        self.assertEqual(len(batch_calls), len(self.MONTHS))
+        self.assertEqual(len(batch_calls[0][1]), 3)
+
+    def test_attendance_months_are_copies(self):
+        months = sheets_handler.get_user_attendance_months("홍길동")
+        months["2026-01"].append("2026-01-31")
+        months["1999-01"] = ["1999-01-01"]
+
+        fresh = sheets_handler.get_user_attendance_months("홍길동")
+        self.assertNotIn("2026-01-31", fresh["2026-01"])
+        self.assertNotIn("1999-01", fresh)
+
+
+class MissingIncentiveSheetTest(_SheetsTestCase):
+    """Incentive 시트가 없을 때 batchGet 400을 받고 나머지 시트만 다시 읽는지 확인합니다."""
+
+    sheets = {name: values for name, values in _sample_sheets().items() if name != "Incentive"}
+
+    def test_batch_get_falls_back_without_optional_sheet(self):
+        tables = sheets_handler.batch_get_values(["UserMaster", "AttendanceLog", "Incentive"])
+
+        self.assertEqual(tables["Incentive"], [])
+        self.assertEqual(tables["UserMaster"], self.sheets["UserMaster"])
+        self.assertEqual(
+            [call[1] for call in self.service.calls],
+            [
+                ("UserMaster!A:G", "AttendanceLog!A:E", "Incentive!A:F"),
+                ("UserMaster!A:G", "AttendanceLog!A:E"),
+            ],
+        )
+
+    def test_all_payrolls_without_incentive_sheet(self):
+        payrolls = sheets_handler.calculate_all_payrolls(2026, 1)
+
+        self.assertEqual([payroll["name"] for payroll in payrolls], ["홍길동", "김교육", "박정규"])
+        self.assertTrue(all(payroll["commission"] == 0 for payroll in payrolls))
+
+    def test_missing_required_sheet_raises(self):
+        with self.assertRaises(ValueError):
+            sheets_handler.batch_get_values(["MaterialOrder", "Incentive"])
+
+
+class MarkOrdersCompletedTest(_SheetsTestCase):
+    """발주 완료 처리가 batchUpdate 한 번으로 모든 행을 쓰는지 확인합니다."""
+
+    sheets = {}
+
+    def test_single_batch_update(self):
+        success, message = sheets_handler.mark_orders_completed([7, 3, 7, 12])
+
+        self.assertTrue(success)
+        self.assertIn("3건", message)
+        self.assertEqual(len(self.service.calls), 1)
+        kind, body = self.service.calls[0]
+        self.assertEqual(kind, "batchUpdate")
+        self.assertEqual(body["valueInputOption"], "USER_ENTERED")
+        self.assertEqual(
+            [item["range"] for item in body["data"]],
+            ["MaterialOrder!D3", "MaterialOrder!D7", "MaterialOrder!D12"],
+        )
+        self.assertEqual(len({item["values"][0][0] for item in body["data"]}), 1)  # 같은 처리시간
+
+    def test_no_rows_skips_api_call(self):
+        success, _ = sheets_handler.mark_orders_completed([])
+
+        self.assertTrue(success)
+        self.assertEqual(self.service.calls, [])
+
+
+class AppendSpillReplayTest(_SheetsTestCase):
+    """종료된 프로세스가 남긴 스필 파일의 행이 다음 전송 때 시트에 추가되는지 확인합니다."""
+
+    sheets = {}
+
+    def setUp(self):
+        super().setUp()
+        self._tmp = tempfile.TemporaryDirectory()
+        for name in ("APPEND_SPILL_DIR", "_append_spill_replayed_pid", "_pending_appends"):
+            self._saved[name] = getattr(sheets_handler, name)
+        sheets_handler.APPEND_BUFFER_ENABLED = True
+        sheets_handler.APPEND_SPILL_DIR = self._tmp.name
+        sheets_handler._append_spill_replayed_pid = None
+        sheets_handler._pending_appends = {}
+
+    def tearDown(self):
+        timer = sheets_handler._append_flush_timer
+        if timer is not None:
+            timer.cancel()
+            sheets_handler._append_flush_timer = None
+        super().tearDown()
+        self._tmp.cleanup()
+
+    def _write_spill(self, pid, rows):
+        path = os.path.join(self._tmp.name, f"append-spill-{pid}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for range_name, row in rows:
+                f.write(json.dumps({"range": range_name, "row": row}, ensure_ascii=False) + "\n")
+            f.write('{"range": "AttendanceLog!A:E", "row": ["잘린')  # 기록 도중 죽어 잘린 줄
+        return path
+
+    def test_dead_process_spill_is_replayed(self):
+        # 방금 끝난 자식 프로세스의 pid = 살아있지 않은 pid
+        child = subprocess.Popen([sys.executable, "-c", "pass"])
+        child.wait()
+        dead_rows = [
+            ("AttendanceLog!A:E", ["2026-01-05", "홍길동", "08:00:00", "출근", "현장"]),
+            ("AttendanceLog!A:E", ["2026-01-05", "김교육", "08:01:00", "출근", "현장"]),
+            ("MaterialLog!A:F", ["2026-01-05", "홍길동", "거실", "흰색", 2, ""]),
+        ]
+        dead_path = self._write_spill(child.pid, dead_rows)
+        # 살아있는 다른 프로세스(부모)의 파일은 건드리지 않음
+        live_path = self._write_spill(os.getppid(), [("AttendanceLog!A:E", ["살아있는 프로세스"])])
+
+        sent = sheets_handler.flush_appends()
+
+        self.assertEqual(sent, 3)
+        appended = {call[1]: call[2] for call in self.service.calls if call[0] == "append"}
+        self.assertEqual(appended["AttendanceLog!A:E"], [row for range_name, row in dead_rows[:2]])
+        self.assertEqual(appended["MaterialLog!A:F"], [dead_rows[2][1]])
+        self.assertFalse(os.path.exists(dead_path))
+        self.assertFalse(os.path.exists(sheets_handler._append_spill_path()))
+        self.assertTrue(os.path.exists(live_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
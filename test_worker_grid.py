@@ -0,0 +1,57 @@
+# test_worker_grid.py (기상청 격자 변환 테스트: python -m unittest test_worker_grid)
+
+import unittest
+
+import worker_main
+
+
+class LatLonToGridTest(unittest.TestCase):
+    """기상청 LCC 변환식이 기상청 격자표와 같은 좌표를 내는지 확인합니다."""
+
+    def test_known_points(self):
+        cases = {
+            "서울": ((37.5665, 126.9780), (60, 127)),
+            "부산": ((35.1796, 129.0756), (98, 76)),
+            "제주": ((33.4996, 126.5312), (53, 38)),
+        }
+        for city, ((lat, lng), expected) in cases.items():
+            with self.subTest(city=city):
+                self.assertEqual(worker_main._latlon_to_grid(lat, lng), expected)
+
+
+class AddressToGridTest(unittest.TestCase):
+    """지오코딩 결과가 있으면 변환식을, 없으면 지역명 대체표를 쓰는지 확인합니다."""
+
+    def setUp(self):
+        self._saved_geocode = worker_main._geocode_address_kakao
+        self.geocoded = {}
+        worker_main._geocode_address_kakao = lambda address: self.geocoded.get(address, (None, None))
+
+    def tearDown(self):
+        worker_main._geocode_address_kakao = self._saved_geocode
+
+    def test_geocoded_address_uses_conversion(self):
+        self.geocoded["부산 중구 중앙대로 100"] = (129.07564, 35.17963)  # (lng, lat)
+
+        self.assertEqual(worker_main._address_to_grid("부산 중구 중앙대로 100"), (98, 76))
+
+    def test_falls_back_to_region_when_geocoding_fails(self):
+        self.assertEqual(worker_main._address_to_grid("서울 광진구 능동로 120"), (62, 126))
+        self.assertEqual(worker_main._address_to_grid("경기도 하남시 미사대로 1"), (64, 126))
+
+    def test_unknown_or_empty_address(self):
+        self.assertEqual(worker_main._address_to_grid("대전 유성구 대학로 99"), (None, None))
+        self.assertEqual(worker_main._address_to_grid(""), (None, None))
+
+
+class RegionToGridTest(unittest.TestCase):
+    """여러 지역명이 들어 있으면 가장 뒤(좁은 지역)에 나온 이름을 쓰는지 확인합니다."""
+
+    def test_last_match_wins(self):
+        self.assertEqual(worker_main._region_to_grid("서울 송파구 올림픽로 300"), (62, 126))
+        self.assertEqual(worker_main._region_to_grid("경기 성남시 분당구"), (62, 123))
+        self.assertEqual(worker_main._region_to_grid("서울 강남구 테헤란로 152"), (61, 126))
+
+
+if __name__ == "__main__":
+    unittest.main()
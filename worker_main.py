@@ -1,18 +1,23 @@
 import json
+import asyncio
 import logging
 import os
+import math
+import time
+import functools
+import threading
 import concurrent.futures
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from urllib.parse import quote, urlencode
 
 import requests
 import pytz
 from slack_sdk import WebClient
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 
 import sheets_handler
+import local_store
+import job_queue
 
 KST = pytz.timezone('Asia/Seoul')
 
@@ -32,10 +37,161 @@ else:
     OPEN_TMAP_BASE_URL = "https://tmapapi.sktelecom.com/main/map.html"
 WEATHER_API_KEY = os.environ.get("WEATHER_API_KEY", "")
 KAKAO_REST_API_KEY = os.environ.get("KAKAO_REST_API_KEY", "")
+# 지오코딩 캐시 유지 시간(초): 좌표를 찾은 주소는 길게, 검색 결과가 없던 주소는 짧게
+GEOCODE_CACHE_TTL = float(os.environ.get("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_CACHE_TTL = float(os.environ.get("GEOCODE_NEGATIVE_CACHE_TTL", str(24 * 3600)))
+
+# 지오코딩 결과 메모리 캐시 (정규화 주소 -> (lng, lat, updated_at)), 로컬 DB 앞단
+_geocode_memo = {}
+_geocode_memo_lock = threading.Lock()
+
+# 길찾기 결과 LRU 캐시 ((출발 좌표, 도착 좌표, 15분 구간) -> 결과), 로컬 DB 앞단
+# (prewarm_travel 요청을 받은 프로세스가 채운 결과를 다른 gunicorn 워커도 로컬 DB에서 재사용)
+TRAVEL_TIME_CACHE_SIZE = int(os.environ.get("TRAVEL_TIME_CACHE_SIZE", "512"))
+TRAVEL_TIME_BUCKET_SECONDS = 15 * 60
+# 출근 시간대 (KST "HH:MM"). prewarm_travel은 이 시간대의 모든 15분 출발 구간을 채웁니다.
+CHECK_IN_WINDOW_START = os.environ.get("CHECK_IN_WINDOW_START", "06:00")
+CHECK_IN_WINDOW_END = os.environ.get("CHECK_IN_WINDOW_END", "09:00")
+_travel_memo = OrderedDict()
+_travel_memo_lock = threading.Lock()
+
+# 단기예보 캐시 ((base_date, base_time, nx, ny) -> (만료 epoch, items)), 키별 단일 요청 잠금
+_weather_cache = {}
+_weather_key_locks = {}
+_weather_cache_lock = threading.Lock()
+# 현장 주소별 마지막 날씨 요약 (현장 주소 -> (강수확률, 강수형태)), 응답이 늦을 때 대체값
+_last_weather_by_site = {}
+
+# 출근 파이프라인 호출별 제한 시간(초) (캘린더/날씨/길찾기 등 부가 정보)
+CHECK_IN_CALL_TIMEOUT = float(os.environ.get("CHECK_IN_CALL_TIMEOUT", "8"))
+# 출근 메시지 전송까지의 목표 시간(초). 넘기면 날씨/길찾기 없이 먼저 보내고 나중에 수정
+CHECK_IN_LATENCY_BUDGET = float(os.environ.get("CHECK_IN_LATENCY_BUDGET", "2"))
+# 공용 I/O 실행기 전체 스레드 수와 작업 종류(lane)별 동시 실행 한도
+WORKER_IO_THREADS = int(os.environ.get("WORKER_IO_THREADS", "16"))
+WORKER_IO_LANES = {
+    "google": 6,    # Sheets / Calendar
+    "external": 6,  # 기상청 / 카카오
+    "slack": 4,     # Slack 메시지 전송
+}
+# lane이 가득 찼을 때 빈 자리를 기다리는 최대 시간(초). 넘으면 호출을 버림 (기본값 반환 또는 IOLaneFull)
+WORKER_IO_BACKPRESSURE_TIMEOUT = float(os.environ.get("WORKER_IO_BACKPRESSURE_TIMEOUT", "2"))
+# 프로세스 기동 시 warm_up()을 백그라운드로 실행할지 여부
+WARMUP_ON_BOOT = os.environ.get("WARMUP_ON_BOOT", "").lower() in ("1", "true", "yes")
+
+
+class IOLaneFull(RuntimeError):
+    """I/O lane에 정해진 시간 안에 빈 자리가 나지 않아 호출을 실행하지 않았을 때 발생합니다."""
+
+
+class _BoundedExecutor:
+    """lane별 동시 실행 한도가 있는 모듈 공용 스레드 풀.
+
+    동시에 여러 출근이 몰려도 스레드 수는 고정이고, 느린 외부 API 하나가 모든 스레드를
+    차지하지 못하도록 lane마다 세마포어로 한도를 둡니다. lane이 가득 차면 빈 자리를
+    잠시 기다리고(backpressure), 그래도 자리가 없으면 호출을 실행하지 않고 버립니다(IOLaneFull).
+    """
+
+    def __init__(self, max_workers: int, lanes: dict, thread_name_prefix: str):
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix
+        )
+        self._lanes = {
+            name: threading.BoundedSemaphore(max(1, min(limit, max_workers)))
+            for name, limit in lanes.items()
+        }
+
+    def try_acquire(self, lane: str) -> bool:
+        """기다리지 않고 lane 자리를 얻습니다. 자리가 없으면 False."""
+        return self._lanes[lane].acquire(blocking=False)
+
+    def release(self, lane: str):
+        self._lanes[lane].release()
+
+    def submit_acquired(self, lane: str, func, *args) -> concurrent.futures.Future:
+        """try_acquire()로 자리를 얻은 뒤 실행합니다. 자리는 실행이 끝나면 반납됩니다."""
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self.release(lane)
+            raise
+        future.add_done_callback(lambda _: self.release(lane))
+        return future
+
+    def submit(self, lane: str, func, *args, wait: float = None) -> concurrent.futures.Future:
+        """동기 호출용 (이벤트 루프에서는 _run_blocking 사용).
+
+        lane 자리를 최대 wait초(기본값 WORKER_IO_BACKPRESSURE_TIMEOUT) 기다리고, 그래도 없으면 IOLaneFull을 올립니다.
+        """
+        wait = WORKER_IO_BACKPRESSURE_TIMEOUT if wait is None else wait
+        if not self._lanes[lane].acquire(timeout=wait):
+            raise IOLaneFull(f"I/O lane '{lane}' 포화 ({wait}초 대기): {func.__name__}")
+        return self.submit_acquired(lane, func, *args)
+
+
+# 이벤트 루프에서 lane 빈 자리를 다시 확인하는 간격(초)
+_LANE_POLL_INTERVAL = 0.02
+
+# 블로킹 I/O 공용 실행기 (요청마다 스레드 풀을 만들지 않음)
+# lane 한도의 합(16)이 스레드 수를 넘지 않으므로 자리를 얻은 호출은 스레드를 기다리지 않습니다.
+_io_pool = _BoundedExecutor(WORKER_IO_THREADS, WORKER_IO_LANES, thread_name_prefix="worker-io")
+
+
+# 기상청 격자 변환 상수 (Lambert Conformal Conic, 기상청 단기예보 격자 5km)
+_KMA_RE = 6371.00877 / 5.0  # 지구 반경(km) / 격자 간격(km)
+_KMA_SLAT1 = math.radians(30.0)  # 표준위도 1
+_KMA_SLAT2 = math.radians(60.0)  # 표준위도 2
+_KMA_OLON = math.radians(126.0)  # 기준점 경도
+_KMA_OLAT = math.radians(38.0)  # 기준점 위도
+_KMA_XO, _KMA_YO = 43, 136  # 기준점 격자 좌표
+_KMA_SN = math.log(math.cos(_KMA_SLAT1) / math.cos(_KMA_SLAT2)) / math.log(
+    math.tan(math.pi * 0.25 + _KMA_SLAT2 * 0.5) / math.tan(math.pi * 0.25 + _KMA_SLAT1 * 0.5)
+)
+_KMA_SF = math.tan(math.pi * 0.25 + _KMA_SLAT1 * 0.5) ** _KMA_SN * math.cos(_KMA_SLAT1) / _KMA_SN
+_KMA_RO = _KMA_RE * _KMA_SF / math.tan(math.pi * 0.25 + _KMA_OLAT * 0.5) ** _KMA_SN
+
+
+# 지오코딩을 쓸 수 없을 때(KAKAO_REST_API_KEY 미설정, API 실패) 쓰는 주요 서울/경기 지역 격자 좌표
+_REGION_GRID_FALLBACK = {
+    # 서울
+    "서울": (60, 127), "강남": (61, 126), "강북": (60, 128), "강동": (62, 126),
+    "강서": (58, 126), "관악": (59, 125), "광진": (62, 126), "구로": (58, 125),
+    "금천": (58, 125), "노원": (61, 129), "도봉": (61, 129), "동대문": (61, 127),
+    "동작": (59, 125), "마포": (59, 126), "서대문": (59, 127), "서초": (61, 125),
+    "성동": (61, 127), "성북": (61, 128), "송파": (62, 126), "양천": (58, 126),
+    "영등포": (58, 125), "용산": (60, 126), "은평": (59, 128), "종로": (60, 127),
+    "중구": (60, 127), "중랑": (62, 128),
+    # 경기
+    "수원": (60, 121), "성남": (62, 123), "고양": (57, 129), "용인": (64, 119),
+    "부천": (56, 125), "안산": (58, 121), "안양": (59, 123), "평택": (58, 114),
+    "시흥": (57, 123), "김포": (55, 128), "의정부": (61, 130), "광명": (58, 125),
+    "광주": (65, 123), "군포": (59, 122), "하남": (64, 126), "오산": (62, 118),
+    "이천": (68, 121), "안성": (65, 115), "화성": (57, 119), "양평": (69, 125),
+    "구리": (62, 127), "남양주": (64, 128), "파주": (56, 131), "의왕": (60, 122),
+    "과천": (60, 124), "광교": (61, 121), "테헤란로": (61, 126),
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def _latlon_to_grid(lat: float, lng: float) -> tuple:
+    """위경도를 기상청 단기예보 격자 좌표(nx, ny)로 변환합니다. (기상청 LCC 변환식)"""
+    ra = _KMA_RE * _KMA_SF / math.tan(math.pi * 0.25 + math.radians(lat) * 0.5) ** _KMA_SN
+    theta = math.radians(lng) - _KMA_OLON
+    if theta > math.pi:
+        theta -= 2.0 * math.pi
+    if theta < -math.pi:
+        theta += 2.0 * math.pi
+    theta *= _KMA_SN
+
+    nx = int(math.floor(ra * math.sin(theta) + _KMA_XO + 0.5))
+    ny = int(math.floor(_KMA_RO - ra * math.cos(theta) + _KMA_YO + 0.5))
+    return nx, ny
 
 
 def _address_to_grid(address: str):
     """주소를 기상청 격자 좌표(nx, ny)로 변환합니다.
+
+    카카오 지오코딩(로컬 캐시)으로 위경도를 구한 뒤 기상청 LCC 변환식으로 격자를 계산합니다.
+    지오코딩을 쓸 수 없으면(키 미설정, API 실패) 주소의 지역명으로 찾습니다.
     
     Args:
         address: 주소 문자열 (예: "서울시 강남구 테헤란로 123")
@@ -45,40 +201,94 @@ def _address_to_grid(address: str):
     """
     if not address:
         return None, None
-    
-    # 주소에서 주요 지역명 추출하여 좌표 매핑
-    # 주요 서울/경기 지역 좌표 (기상청 격자 좌표)
-    region_coords = {
-        # 서울
-        "서울": (60, 127), "강남": (61, 126), "강북": (60, 128), "강동": (62, 126),
-        "강서": (58, 126), "관악": (59, 125), "광진": (62, 126), "구로": (58, 125),
-        "금천": (58, 125), "노원": (61, 129), "도봉": (61, 129), "동대문": (61, 127),
-        "동작": (59, 125), "마포": (59, 126), "서대문": (59, 127), "서초": (61, 125),
-        "성동": (61, 127), "성북": (61, 128), "송파": (62, 126), "양천": (58, 126),
-        "영등포": (58, 125), "용산": (60, 126), "은평": (59, 128), "종로": (60, 127),
-        "중구": (60, 127), "중랑": (62, 128),
-        # 경기
-        "수원": (60, 121), "성남": (62, 123), "고양": (57, 129), "용인": (64, 119),
-        "부천": (56, 125), "안산": (58, 121), "안양": (59, 123), "평택": (58, 114),
-        "시흥": (57, 123), "김포": (55, 128), "의정부": (61, 130), "광명": (58, 125),
-        "광주": (65, 123), "군포": (59, 122), "하남": (64, 126), "오산": (62, 118),
-        "이천": (68, 121), "안성": (65, 115), "화성": (57, 119), "양평": (69, 125),
-        "구리": (62, 127), "남양주": (64, 128), "파주": (56, 131), "의왕": (60, 122),
-        "과천": (60, 124), "광교": (61, 121), "테헤란로": (61, 126),
-    }
-    
-    # 주소에서 지역명 매칭
-    address_lower = address.lower()
-    for region, coords in region_coords.items():
-        if region in address or region.lower() in address_lower:
-            return coords
-    
-    # 매칭 실패 시 서울 기본값
-    return (60, 127)
+
+    lng, lat = _geocode_address_kakao(address)
+    if lng is None or lat is None:
+        return _region_to_grid(address)
+
+    # 소수 넷째 자리(약 10m)로 반올림해 변환 결과 캐시 적중률을 높임 (격자 간격 5km)
+    return _latlon_to_grid(round(lat, 4), round(lng, 4))
+
+
+def _region_to_grid(address: str):
+    """주소에 포함된 지역명으로 격자 좌표를 찾습니다 (지오코딩 불가 시 대체).
+
+    주소는 넓은 지역 → 좁은 지역 순이므로 여러 지역명이 있으면 가장 뒤에 나온 이름을 사용합니다
+    (예: "서울 광진구"는 "광진"). 일치하는 지역이 없으면 (None, None)을 반환합니다.
+    """
+    matches = [region for region in _REGION_GRID_FALLBACK if region in address]
+    if not matches:
+        return None, None
+    return _REGION_GRID_FALLBACK[max(matches, key=lambda region: (address.rfind(region), len(region)))]
+
+
+def _normalize_address(address: str) -> str:
+    """지오코딩 캐시 키용 주소 정규화 (앞뒤 공백 제거, 연속 공백 축약, 소문자)"""
+    return " ".join(address.split()).lower()
+
+
+def _get_cached_geocode(key: str):
+    """메모리 → 로컬 DB 순으로 유효한 지오코딩 결과를 찾습니다. 없거나 만료됐으면 None."""
+    with _geocode_memo_lock:
+        entry = _geocode_memo.get(key)
+    if entry is None:
+        entry = local_store.get_geocode(key)
+        if entry is None:
+            return None
+        with _geocode_memo_lock:
+            _geocode_memo[key] = entry
+
+    lng, lat, updated_at = entry
+    ttl = GEOCODE_CACHE_TTL if lng is not None else GEOCODE_NEGATIVE_CACHE_TTL
+    if time.time() - updated_at >= ttl:
+        return None
+    return lng, lat
+
+
+def _store_geocode(key: str, lng, lat):
+    with _geocode_memo_lock:
+        _geocode_memo[key] = (lng, lat, time.time())
+    local_store.put_geocode(key, lng, lat)
+
+
+def _request_kakao_geocode(address: str) -> tuple:
+    """카카오 로컬 API로 주소(실패 시 키워드)를 검색합니다. 요청 오류는 예외로 올립니다.
+
+    Returns:
+        tuple: (lng, lat) 좌표. 검색 결과가 없으면 (None, None)
+    """
+    url = "https://dapi.kakao.com/v2/local/search/address.json"
+    headers = {"Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"}
+    response = sheets_handler.get_http_session("kakao").get(
+        url, headers=headers, params={"query": address}, timeout=3
+    )
+    response.raise_for_status()
+
+    data = response.json()
+    if data.get("documents"):
+        doc = data["documents"][0]
+        return float(doc["x"]), float(doc["y"])  # lng, lat
+
+    # 주소 검색 실패 시 키워드 검색 시도
+    url_keyword = "https://dapi.kakao.com/v2/local/search/keyword.json"
+    response = sheets_handler.get_http_session("kakao").get(
+        url_keyword, headers=headers, params={"query": address}, timeout=3
+    )
+    response.raise_for_status()
+
+    data = response.json()
+    if data.get("documents"):
+        doc = data["documents"][0]
+        return float(doc["x"]), float(doc["y"])
+
+    return None, None
 
 
 def _geocode_address_kakao(address: str) -> tuple:
-    """주소 → 좌표 변환 (카카오 로컬 API)
+    """주소 → 좌표 변환 (카카오 로컬 API, 로컬 캐시 우선)
+
+    검색 결과(없음 포함)는 정규화한 주소를 키로 로컬 DB에 저장해 두고 TTL 동안 재사용합니다.
+    요청 오류/타임아웃은 캐시하지 않습니다.
 
     Args:
         address: 주소 문자열
@@ -86,46 +296,77 @@ def _geocode_address_kakao(address: str) -> tuple:
     Returns:
         tuple: (lng, lat) 좌표. 실패 시 (None, None)
     """
-    if not KAKAO_REST_API_KEY or not address:
+    if not address or not address.strip():
         return None, None
 
-    try:
-        url = "https://dapi.kakao.com/v2/local/search/address.json"
-        headers = {"Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"}
-        response = requests.get(
-            url, headers=headers, params={"query": address}, timeout=3
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        if data.get("documents"):
-            doc = data["documents"][0]
-            return float(doc["x"]), float(doc["y"])  # lng, lat
-
-        # 주소 검색 실패 시 키워드 검색 시도
-        url_keyword = "https://dapi.kakao.com/v2/local/search/keyword.json"
-        response = requests.get(
-            url_keyword, headers=headers, params={"query": address}, timeout=3
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        if data.get("documents"):
-            doc = data["documents"][0]
-            return float(doc["x"]), float(doc["y"])
+    key = _normalize_address(address)
+    cached = _get_cached_geocode(key)
+    if cached is not None:
+        return cached
 
+    if not KAKAO_REST_API_KEY:
         return None, None
+
+    try:
+        lng, lat = _request_kakao_geocode(address)
     except Exception as e:
         logging.warning(f"카카오 지오코딩 실패: {e}")
         return None, None
 
+    _store_geocode(key, lng, lat)
+    return lng, lat
+
+
+def _travel_cache_key(start: tuple, end: tuple, departure: datetime) -> tuple:
+    """(출발 좌표, 도착 좌표, 출발 시각 15분 구간) 캐시 키. 좌표는 소수 셋째 자리(약 100m)로 반올림."""
+    bucket = int(departure.timestamp()) // TRAVEL_TIME_BUCKET_SECONDS
+    return (
+        round(start[0], 3), round(start[1], 3),
+        round(end[0], 3), round(end[1], 3),
+        bucket,
+    )
+
 
-def _get_travel_time(start_addr: str, end_addr: str) -> dict:
+def _travel_memo_get(key):
+    """메모리 → 로컬 DB 순으로 길찾기 결과를 찾습니다. 없으면 None."""
+    with _travel_memo_lock:
+        result = _travel_memo.get(key)
+        if result is not None:
+            _travel_memo.move_to_end(key)
+            return result
+
+    stored = local_store.get_travel_time(json.dumps(key))
+    if stored is None:
+        return None
+    result = json.loads(stored)
+    _travel_memo_remember(key, result)
+    return result
+
+
+def _travel_memo_remember(key, result: dict):
+    with _travel_memo_lock:
+        _travel_memo[key] = result
+        _travel_memo.move_to_end(key)
+        while len(_travel_memo) > TRAVEL_TIME_CACHE_SIZE:
+            _travel_memo.popitem(last=False)  # 가장 오래 안 쓴 항목 제거
+
+
+def _travel_memo_put(key, result: dict):
+    _travel_memo_remember(key, result)
+    local_store.put_travel_time(json.dumps(key), json.dumps(result, ensure_ascii=False))
+
+
+def _get_travel_time(start_addr: str, end_addr: str, departure: datetime = None, cache_departures: list = None) -> dict:
     """두 주소 간 소요시간 계산 (카카오 모빌리티 길찾기 API)
 
+    같은 좌표 구간/같은 15분 출발 구간의 결과는 LRU 메모리 캐시와 로컬 DB에서 재사용합니다.
+
     Args:
         start_addr: 출발지 주소
         end_addr: 도착지 주소
+        departure: 출발 시각 (기본값: 현재 KST)
+        cache_departures: 예열용. 주어지면 departure 대신 이 출발 시각들의 구간을 모두 확인하고,
+            비어 있는 구간이 있으면 API를 한 번만 호출해 그 결과를 비어 있는 구간 모두에 저장합니다.
 
     Returns:
         dict: {"duration": 분, "distance": km, "error": None} 또는 {"error": "메시지"}
@@ -137,17 +378,21 @@ def _get_travel_time(start_addr: str, end_addr: str) -> dict:
         return {"error": "주소 없음"}
 
     try:
-        # 1. 주소 → 좌표 변환 (병렬로 처리)
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-            start_future = executor.submit(_geocode_address_kakao, start_addr)
-            end_future = executor.submit(_geocode_address_kakao, end_addr)
-
-            start_lng, start_lat = start_future.result()
-            end_lng, end_lat = end_future.result()
+        # 1. 주소 → 좌표 변환 (로컬 캐시에서 대부분 바로 반환되므로 순차 처리)
+        start_lng, start_lat = _geocode_address_kakao(start_addr)
+        end_lng, end_lat = _geocode_address_kakao(end_addr)
 
         if not all([start_lng, start_lat, end_lng, end_lat]):
             return {"error": "주소 변환 실패"}
 
+        cache_keys = [
+            _travel_cache_key((start_lng, start_lat), (end_lng, end_lat), when)
+            for when in (cache_departures or [departure or datetime.now(KST)])
+        ]
+        cached = [_travel_memo_get(key) for key in cache_keys]
+        if all(hit is not None for hit in cached):
+            return dict(cached[0])
+
         # 2. 카카오 모빌리티 길찾기 API 호출
         url = "https://apis-navi.kakaomobility.com/v1/directions"
         headers = {"Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"}
@@ -157,7 +402,7 @@ def _get_travel_time(start_addr: str, end_addr: str) -> dict:
             "priority": "RECOMMEND",  # 추천 경로
         }
 
-        response = requests.get(url, headers=headers, params=params, timeout=5)
+        response = sheets_handler.get_http_session("kakao").get(url, headers=headers, params=params, timeout=5)
         response.raise_for_status()
 
         data = response.json()
@@ -168,13 +413,19 @@ def _get_travel_time(start_addr: str, end_addr: str) -> dict:
             duration_sec = summary.get("duration", 0)
             distance_m = summary.get("distance", 0)
 
-            return {
+            result = {
                 "duration": duration_sec // 60,  # 초 → 분
                 "distance": round(distance_m / 1000, 1),  # m → km
                 "error": None,
             }
+        else:
+            result = {"error": "경로 없음"}
 
-        return {"error": "경로 없음"}
+        # 타임아웃/요청 오류는 캐시하지 않고, API가 응답한 결과만 저장
+        for key, hit in zip(cache_keys, cached):
+            if hit is None:
+                _travel_memo_put(key, result)
+        return dict(result)
 
     except requests.exceptions.Timeout:
         logging.warning("카카오 길찾기 API 타임아웃")
@@ -184,6 +435,170 @@ def _get_travel_time(start_addr: str, end_addr: str) -> dict:
         return {"error": str(e)}
 
 
+def _check_in_window_departures(day: datetime) -> list:
+    """day(KST) 날짜의 출근 시간대(CHECK_IN_WINDOW_START~END)에 속한 15분 출발 구간 시작 시각 목록."""
+    def _at(hhmm: str) -> datetime:
+        hour, minute = map(int, hhmm.split(":"))
+        return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    departure = _at(CHECK_IN_WINDOW_START)
+    window_end = _at(CHECK_IN_WINDOW_END)
+    departures = []
+    while departure <= window_end:
+        departures.append(departure)
+        departure += timedelta(seconds=TRAVEL_TIME_BUCKET_SECONDS)
+    return departures
+
+
+def prewarm_travel_times(departure: datetime = None) -> int:
+    """모든 직원의 집 → 오늘 현장 경로를 한 번에 계산해 캐시를 채웁니다.
+
+    하루 시작 시 스케줄러가 worker에 {"action": "prewarm_travel"}로 호출하는 용도입니다.
+    departure가 없으면 현재 시각과 출근 시간대(CHECK_IN_WINDOW_START~END)의 모든 15분 출발 구간을 채우며,
+    경로마다 길찾기 API는 한 번만 호출합니다 (API가 현재 교통 상황 기준이라 구간별 결과가 같음).
+
+    Args:
+        departure: 캐시할 출발 시각 (주면 그 구간만 채움)
+
+    Returns:
+        int: 소요시간을 계산한 경로 수
+    """
+    site_addresses = _get_today_site_addresses()
+    home_addresses = {user["address"] for user in sheets_handler.get_all_users() if user.get("address")}
+    if not site_addresses or not home_addresses:
+        return 0
+
+    if departure is not None:
+        departures = [departure]
+    else:
+        now = datetime.now(KST)
+        departures = [now] + _check_in_window_departures(now)
+    pairs = [(home, site) for home in sorted(home_addresses) for site in site_addresses]
+    futures = []
+    for home, site in pairs:
+        try:
+            # 예열은 급하지 않으므로 앞선 경로가 끝나 자리가 날 때까지 길게 기다림
+            futures.append(_io_pool.submit(
+                "external", _get_travel_time, home, site, None, departures, wait=CHECK_IN_CALL_TIMEOUT,
+            ))
+        except IOLaneFull as e:
+            logging.warning(f"소요시간 캐시 예열 건너뜀: {e}")
+    results = [future.result() for future in futures]
+
+    warmed = sum(1 for result in results if not result.get("error"))
+    logging.info(f"소요시간 캐시 예열 완료: {warmed}/{len(pairs)} 경로, 출발 구간 {len(departures)}개")
+    return warmed
+
+
+def warm_up() -> dict:
+    """Google 클라이언트 풀과 캐시를 미리 준비합니다 (/warmup 엔드포인트, 기동 시 워밍업)."""
+    return sheets_handler.warm_up(GOOGLE_CALENDAR_ID)
+
+
+def start_boot_warm_up():
+    """WARMUP_ON_BOOT가 켜져 있으면 백그라운드 스레드에서 warm_up()을 실행합니다."""
+    if not WARMUP_ON_BOOT:
+        return
+    threading.Thread(target=warm_up, name="boot-warm-up", daemon=True).start()
+
+
+def _forecast_base_time(kst: datetime) -> tuple:
+    """현재 시각에 조회 가능한 가장 최근 단기예보 발표 시각을 반환합니다.
+
+    단기예보 발표시각: 02, 05, 08, 11, 14, 17, 20, 23시
+    발표 후 약 10분 뒤에야 API에서 조회 가능하므로 버퍼를 적용합니다.
+
+    Returns:
+        tuple: (base_date "YYYYMMDD", base_time_hour)
+    """
+    current_hour = kst.hour
+    current_minute = kst.minute
+    base_times = [23, 20, 17, 14, 11, 8, 5, 2]
+
+    # 자정~02:10 사이는 전날 23시 발표 데이터 사용
+    if current_hour < 2 or (current_hour == 2 and current_minute < 10):
+        return (kst - timedelta(days=1)).strftime("%Y%m%d"), 23
+
+    for bt in base_times:
+        # 발표 시각 + 10분 이후에만 해당 데이터 사용 가능
+        if current_hour > bt or (current_hour == bt and current_minute >= 10):
+            return kst.strftime("%Y%m%d"), bt
+
+    return (kst - timedelta(days=1)).strftime("%Y%m%d"), 23  # 기본값 (전날 23시 발표)
+
+
+def _forecast_expires_at(base_date: str, base_time: str) -> float:
+    """해당 발표 데이터의 캐시 만료 시각(epoch): 다음 발표(3시간 후)가 조회 가능해지는 시점"""
+    base_dt = KST.localize(datetime.strptime(base_date + base_time, "%Y%m%d%H%M"))
+    return (base_dt + timedelta(hours=3, minutes=10)).timestamp()
+
+
+def _get_forecast_items(base_date: str, base_time: str, nx: int, ny: int):
+    """단기예보 항목을 (base_date, base_time, nx, ny) 단위로 캐시해서 반환합니다.
+
+    같은 키를 동시에 요청하면 한 스레드만 API를 호출하고 나머지는 그 결과를 기다립니다.
+    오류 응답이나 빈 응답은 캐시하지 않습니다.
+
+    Returns:
+        list: 예보 항목 리스트. 조회 실패 시 None
+    """
+    key = (base_date, base_time, nx, ny)
+    now = time.time()
+    with _weather_cache_lock:
+        entry = _weather_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        key_lock = _weather_key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _weather_cache_lock:
+            entry = _weather_cache.get(key)
+            if entry and entry[0] > time.time():
+                return entry[1]
+
+        api_url = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getVilageFcst"
+        params = {
+            "serviceKey": WEATHER_API_KEY,
+            "numOfRows": 100,
+            "pageNo": 1,
+            "dataType": "JSON",
+            "base_date": base_date,
+            "base_time": base_time,
+            "nx": nx,
+            "ny": ny,
+        }
+
+        response = sheets_handler.get_http_session("kma").get(api_url, params=params, timeout=3)
+        logging.info(f"날씨 API 응답 상태: {response.status_code}")
+        response.raise_for_status()
+
+        data = response.json()
+
+        # 응답 확인
+        result_code = data.get("response", {}).get("header", {}).get("resultCode")
+        result_msg = data.get("response", {}).get("header", {}).get("resultMsg", "")
+        logging.info(f"날씨 API 결과 코드: {result_code} - {result_msg}")
+
+        if result_code != "00":
+            logging.warning(f"날씨 API 오류: {result_msg}")
+            return None
+
+        items = data.get("response", {}).get("body", {}).get("items", {}).get("item", [])
+        logging.info(f"날씨 API 데이터 개수: {len(items) if items else 0}")
+        if not items:
+            logging.warning("날씨 데이터가 없습니다.")
+            return None
+
+        now = time.time()
+        with _weather_cache_lock:
+            # 지난 발표 시각의 만료된 항목 정리
+            for old_key in [k for k, (expires_at, _) in _weather_cache.items() if expires_at <= now]:
+                del _weather_cache[old_key]
+                _weather_key_locks.pop(old_key, None)
+            _weather_cache[key] = (_forecast_expires_at(base_date, base_time), items)
+        return items
+
+
 def _get_weather_forecast(site_address: str = None):
     """기상청 단기예보 API를 사용하여 오후 시간대의 날씨 정보를 가져옵니다.
     
@@ -207,30 +622,7 @@ def _get_weather_forecast(site_address: str = None):
         current_hour = kst.hour
         current_minute = kst.minute
 
-        # 단기예보 발표시각: 02, 05, 08, 11, 14, 17, 20, 23시
-        # 발표 후 약 10분 뒤에야 API에서 조회 가능하므로 버퍼 적용
-        base_times = [23, 20, 17, 14, 11, 8, 5, 2]
-        base_time_hour = None
-
-        # 자정~02:10 사이는 전날 23시 발표 데이터 사용
-        if current_hour < 2 or (current_hour == 2 and current_minute < 10):
-            base_time_hour = 23
-            yesterday = (kst - timedelta(days=1)).strftime("%Y%m%d")
-            base_date = yesterday
-        else:
-            for bt in base_times:
-                # 발표 시각 + 10분 이후에만 해당 데이터 사용 가능
-                if current_hour > bt or (current_hour == bt and current_minute >= 10):
-                    base_time_hour = bt
-                    break
-
-            if base_time_hour is None:
-                base_time_hour = 23  # 기본값 (전날 23시 발표)
-                yesterday = (kst - timedelta(days=1)).strftime("%Y%m%d")
-                base_date = yesterday
-            else:
-                base_date = today
-
+        base_date, base_time_hour = _forecast_base_time(kst)
         base_time = f"{base_time_hour:02d}00"
         logging.info(f"날씨 API base_time 선택: {base_date} {base_time} (현재: {current_hour}:{current_minute:02d})")
         
@@ -247,38 +639,9 @@ def _get_weather_forecast(site_address: str = None):
             nx = 60
             ny = 127
         
-        # API 호출
-        api_url = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getVilageFcst"
-        params = {
-            "serviceKey": WEATHER_API_KEY,
-            "numOfRows": 100,
-            "pageNo": 1,
-            "dataType": "JSON",
-            "base_date": base_date,
-            "base_time": base_time,
-            "nx": nx,
-            "ny": ny,
-        }
-        
-        response = requests.get(api_url, params=params, timeout=3)
-        logging.info(f"날씨 API 응답 상태: {response.status_code}")
-        response.raise_for_status()
-
-        data = response.json()
-
-        # 응답 확인
-        result_code = data.get("response", {}).get("header", {}).get("resultCode")
-        result_msg = data.get("response", {}).get("header", {}).get("resultMsg", "")
-        logging.info(f"날씨 API 결과 코드: {result_code} - {result_msg}")
-
-        if result_code != "00":
-            logging.warning(f"날씨 API 오류: {result_msg}")
-            return None, None, None
-        
-        items = data.get("response", {}).get("body", {}).get("items", {}).get("item", [])
-        logging.info(f"날씨 API 데이터 개수: {len(items) if items else 0}")
+        # API 호출 (같은 발표 시각/격자는 다음 발표 전까지 캐시 재사용)
+        items = _get_forecast_items(base_date, base_time, nx, ny)
         if not items:
-            logging.warning("날씨 데이터가 없습니다.")
             return None, None, None
         
         # 오후 시간대(12시~18시)의 강수확률과 강수형태 조회
@@ -352,6 +715,8 @@ def _get_weather_forecast(site_address: str = None):
                     pty = "눈"
 
         logging.info(f"날씨 조회 완료 - 강수확률: {pop}%, 강수형태: {pty}")
+        if site_address and pop is not None:
+            _last_weather_by_site[site_address] = (pop, pty)
         return pop, pty, None
         
     except requests.exceptions.RequestException as e:
@@ -368,49 +733,19 @@ def _get_today_site_addresses():
     Returns:
         list: 현장 주소 리스트. 일정이 없거나 주소가 없으면 SITE_ADDRESS를 포함한 리스트 반환.
     """
+    from googleapiclient.errors import HttpError
+
     if not GOOGLE_CALENDAR_ID:
         logging.warning("GOOGLE_CALENDAR_ID not set; using SITE_ADDRESS")
         return [SITE_ADDRESS] if SITE_ADDRESS else []
     
     try:
-        # 서비스 계정 인증
-        json_str = os.environ.get("GCF_CREDENTIALS")
-        if not json_str:
+        if not os.environ.get("GCF_CREDENTIALS"):
             logging.warning("GCF_CREDENTIALS not set; using SITE_ADDRESS")
             return [SITE_ADDRESS] if SITE_ADDRESS else []
-        
-        credentials_dict = json.loads(json_str)
-        creds = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar.readonly"]
-        )
-        
-        # Calendar API 서비스 생성
-        service = build("calendar", "v3", credentials=creds, cache_discovery=False)
-        
-        # 오늘 날짜의 시작/끝 시간 계산 (KST 기준)
-        now = datetime.now(sheets_handler.KST)
-        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
-        
-        # ISO 8601 형식으로 변환
-        time_min = start_of_day.isoformat()
-        time_max = end_of_day.isoformat()
-        
-        # 오늘 일정 조회
-        events_result = (
-            service.events()
-            .list(
-                calendarId=GOOGLE_CALENDAR_ID,
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-        
-        events = events_result.get("items", [])
+
+        # 오늘 일정 조회 (공용 Calendar 클라이언트와 일정 캐시 재사용)
+        events = sheets_handler.get_today_calendar_events(GOOGLE_CALENDAR_ID)
         
         if not events:
             logging.info("No events found for today; using SITE_ADDRESS")
@@ -440,193 +775,406 @@ def _get_today_site_addresses():
 
 
 
+class DuplicateInFlight(job_queue.JobDeferred):
+    """같은 키의 작업이 아직 처리 중('running')입니다. 완료되거나 오래 방치된 키가 될 때까지 다시 시도합니다."""
+
+
+def make_idempotency_key(action: str, user_id: str, user_name: str):
+    """작업 중복 실행 방지 키 (사용자, 작업, KST 날짜). 출근/퇴근은 하루 한 번만 처리합니다."""
+    if action not in ("check_in", "check_out"):
+        return None
+    user_key = user_id or user_name
+    if not user_key:
+        return None
+    today = datetime.now(KST).strftime("%Y-%m-%d")
+    return f"{action}:{user_key}:{today}"
+
+
 def worker(request):
     """Cloud Tasks에서 호출하는 워커 엔드포인트.
 
     payload 예시:
     {
-        "action": "check_in" | "check_out",
+        "action": "check_in" | "check_out" | "prewarm_travel",
         "user_id": "...",
         "user_name": "...",
-        "channel_id": "..."
+        "channel_id": "...",
+        "idempotency_key": "..."  (선택, 없으면 사용자/작업/날짜로 생성)
+        "departure_time": "07:30"  (prewarm_travel 전용, 선택)
     }
     """
     data = request.get_json(silent=True) or {}
+    try:
+        process_task(data)
+        return ("", 200)
+    except DuplicateInFlight as e:
+        # Cloud Tasks는 2xx가 아니면 나중에 다시 보냄
+        logging.info("worker duplicate in flight: %s", e)
+        return ("", 409)
+    except Exception as e:
+        logging.exception("Error in worker: %s", e)
+        return ("", 500)
+
+
+# 같은 날 이미 처리된 출퇴근을 다시 누른 사용자에게 보내는 안내 (본인에게만 보임)
+_ALREADY_RECORDED_NOTICES = {
+    "check_in": "ℹ️ 오늘 이미 출근이 기록되었습니다.",
+    "check_out": "ℹ️ 오늘 이미 퇴근이 기록되었습니다.",
+}
+
+
+def process_task(data: dict):
+    """워커 작업 하나를 처리합니다. 실패하면 예외를 그대로 올립니다 (작업 큐 재시도용).
+
+    같은 키의 작업이 이미 완료됐으면 사용자에게 이미 기록됐다는 안내만 보냅니다. 아직 처리 중이면(다른 작업 스레드, 또는
+    처리 중 죽은 프로세스) DuplicateInFlight를 올려 작업이 삭제되지 않고 나중에 다시 시도되게 합니다.
+    """
     action = data.get("action")
     user_id = data.get("user_id")
     user_name = data.get("user_name")
     channel_id = data.get("channel_id") or user_id
+    idempotency_key = data.get("idempotency_key") or make_idempotency_key(action, user_id, user_name)
 
     logging.info("worker start: action=%s user=%s channel=%s", action, user_name, channel_id)
 
+    if idempotency_key and not local_store.claim_idempotency_key(idempotency_key):
+        state = local_store.get_idempotency_key(idempotency_key)
+        if state is not None and state[0] == "done":
+            logging.info("worker skip duplicate: key=%s", idempotency_key)
+            if action in _ALREADY_RECORDED_NOTICES and user_id:
+                _send_slack_ephemeral(channel_id, user_id, _ALREADY_RECORDED_NOTICES[action])
+            return
+        # 처리 중인 키: 오래 방치된 키로 판정될 때까지 기다렸다가 다시 시도
+        retry_after = 1.0
+        if state is not None:
+            retry_after = local_store.IDEMPOTENCY_STALE_SECONDS - (time.time() - state[1]) + 1
+        raise DuplicateInFlight(f"key={idempotency_key} 처리 중", retry_after=retry_after)
+
     try:
         if action == "check_in":
-            _handle_check_in(user_id, user_name, channel_id)
+            _handle_check_in(user_id, user_name, channel_id, idempotency_key)
         elif action == "check_out":
-            _handle_check_out(user_id, user_name, channel_id)
+            _handle_check_out(user_id, user_name, channel_id, idempotency_key)
+        elif action == "prewarm_travel":
+            departure = None
+            if data.get("departure_time"):  # "HH:MM" (오늘 KST 출발 예정 시각)
+                hour, minute = map(int, data["departure_time"].split(":"))
+                departure = datetime.now(KST).replace(hour=hour, minute=minute, second=0, microsecond=0)
+            prewarm_travel_times(departure)
         else:
             logging.warning("Unknown action in task payload: %s", action)
-        return ("", 200)
-    except Exception as e:
-        logging.exception("Error in worker: %s", e)
-        return ("", 500)
+    finally:
+        # 기록까지 끝난 키는 완료 상태라 해제되지 않고, 기록 전에 실패한 키만 다시 시도 가능해집니다.
+        if idempotency_key:
+            local_store.release_idempotency_key(idempotency_key)
+
+
+async def _run_blocking(lane: str, func, *args, timeout=None, default=None):
+    """블로킹 함수를 공용 I/O 실행기의 lane에서 실행하고 결과를 기다립니다.
+
+    lane 자리는 이벤트 루프를 막지 않도록 asyncio.sleep으로 짧게 쉬며 기다리고, 최대
+    WORKER_IO_BACKPRESSURE_TIMEOUT초(timeout이 더 짧으면 timeout초) 안에 자리가 나지 않으면 호출을 버립니다.
+    이때 timeout이 주어졌으면 default를 반환하고, 아니면 IOLaneFull을 올립니다.
+
+    timeout(초)이 주어지면 자리 대기와 실행을 합쳐 그 시간 안에 끝나지 않을 때 default를 반환합니다.
+    (이미 시작된 호출은 백그라운드에서 마저 끝나고 결과는 버려집니다.)
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    wait = WORKER_IO_BACKPRESSURE_TIMEOUT if timeout is None else min(WORKER_IO_BACKPRESSURE_TIMEOUT, timeout)
+
+    while not _io_pool.try_acquire(lane):
+        if loop.time() - started >= wait:
+            if timeout is None:
+                raise IOLaneFull(f"I/O lane '{lane}' 포화 ({wait}초 대기): {func.__name__}")
+            logging.warning(f"I/O lane '{lane}' 포화, {func.__name__} 호출 생략 (기본값 사용)")
+            return default
+        await asyncio.sleep(_LANE_POLL_INTERVAL)
+
+    future = asyncio.wrap_future(_io_pool.submit_acquired(lane, func, *args))
+    if timeout is None:
+        return await future
+    try:
+        return await asyncio.wait_for(future, max(0.0, timeout - (loop.time() - started)))
+    except asyncio.TimeoutError:
+        logging.warning(f"{func.__name__} 시간 초과 ({timeout}초), 기본값 사용")
+        return default
 
 
-def _handle_check_in(user_id: str, user_name: str, channel_id: str):
+def _handle_check_in(user_id: str, user_name: str, channel_id: str, idempotency_key: str = None):
     """실제 출근 기록 및 게임화 메시지 전송.
 
     user_id (Slack_ID)를 우선 사용하여 UserMaster 조회 후,
     한글 이름으로 치환해서 사용한다.
 
-    성능 최적화: 독립적인 작업들을 병렬로 실행합니다.
+    성능 최적화: 이벤트 루프 하나에서 외부 호출들을 동시에 진행합니다. (_check_in_pipeline)
     """
-    # Phase 1: 사용자 정보와 캘린더 정보를 병렬로 조회
-    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-        user_info_future = executor.submit(
-            lambda: sheets_handler.get_user_info(user_id) if user_id else None
-        )
-        calendar_future = executor.submit(_get_today_site_addresses)
-
-        user_info = user_info_future.result()
-        site_addresses = calendar_future.result()
+    asyncio.run(_check_in_pipeline(user_id, user_name, channel_id, idempotency_key))
 
-    # Slack_ID로 못 찾으면 user_name(핸들)로 재시도
-    if not user_info and user_name:
-        user_info = sheets_handler.get_user_info(user_name)
 
-    # 시트 기록용 이름 (항상 한글 이름 사용을 시도)
-    if user_info and user_info.get("name"):
-        name_for_log = user_info["name"]
-    else:
-        # user_name이 비어있으면 Slack 멘션 형태로 fallback
-        name_for_log = user_name or f"<@{user_id}>"
-
-    # 화면 표시용 이름 (한글 이름 → 핸들 → 멘션 순으로 우선)
-    if user_info and user_info.get("name"):
-        display_name = user_info["name"]
-    elif user_name:
-        display_name = user_name
-    else:
-        display_name = f"<@{user_id}>"
+async def _check_in_pipeline(user_id: str, user_name: str, channel_id: str, idempotency_key: str = None):
+    """출근 처리 파이프라인.
 
-    # 출근 기록에는 첫 번째 주소만 사용 (기존 호환성 유지)
-    site_address = site_addresses[0] if site_addresses else SITE_ADDRESS
+    블로킹 호출(Sheets/캘린더/기상청/카카오/Slack)은 공용 I/O 실행기에서 돌리고,
+    날씨/길찾기 같은 부가 정보는 호출별 제한 시간(CHECK_IN_CALL_TIMEOUT)을 넘기면 생략합니다.
 
-    # 직원 집 주소 (소요시간 계산용)
-    home_address = user_info.get("address", "") if user_info else ""
+    출근 메시지는 처리 시작 후 CHECK_IN_LATENCY_BUDGET초 안에 보냅니다. 모든 대기(사용자/캘린더 조회,
+    출근 기록, 근무일수 조회, 날씨/길찾기)는 같은 마감 시각까지만 기다리고, 그때까지 끝나지 않은 값은
+    캐시된 사용자 정보, 기본 현장 주소, "집계 중" 같은 대체 값으로 먼저 보냅니다.
+    출근 기록은 마감과 상관없이 끝까지 진행하며, 늦게 끝난 결과(기록 실패 포함)는 chat_update로 메시지를 수정합니다.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CHECK_IN_LATENCY_BUDGET
 
-    # 출근 기록 (비고란에 현장 주소 포함) - 이건 반드시 먼저 실행
-    success, msg = sheets_handler.record_check_in(name_for_log, site_address)
-    if not success:
-        _send_slack(
-            channel_id,
-            f"❌ **출근 기록 실패:** {msg}",
-        )
-        return
+    def _remaining():
+        return max(0.0, deadline - loop.time())
 
     now = datetime.now(sheets_handler.KST)
     current_year = now.year
     current_month = now.month
-
-    # Phase 2: 출근 기록 후 필요한 데이터들을 병렬로 조회
-    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        # 날씨 정보 (가장 오래 걸릴 수 있음)
-        weather_future = executor.submit(_get_weather_forecast, site_address)
-        # 총 근무일수
-        total_days_future = executor.submit(sheets_handler.get_total_work_days, name_for_log)
-        # 이번 달 근무 횟수
-        monthly_count_future = executor.submit(
-            sheets_handler.get_monthly_work_count, name_for_log, current_year, current_month
-        )
+    default_sites = [SITE_ADDRESS] if SITE_ADDRESS else []
+
+    # Phase 1: 사용자 정보와 캘린더 정보를 동시에 조회
+    # UserMaster/AttendanceLog는 batchGet 한 번으로 미리 읽어 두어
+    # 이후 근무일수/월간 출동 횟수 조회가 캐시에서 바로 처리되도록 한다.
+    def _load_user_info():
+        sheets_handler.prefetch_tables(["UserMaster", "AttendanceLog"])
+        return sheets_handler.get_user_info(user_id) if user_id else None
+
+    user_task = asyncio.ensure_future(_run_blocking("google", _load_user_info))
+    site_task = asyncio.ensure_future(_run_blocking(
+        "google", _get_today_site_addresses, timeout=CHECK_IN_CALL_TIMEOUT, default=default_sites,
+    ))
+    enrich_tasks = {}  # "weather" / "travel" → 날씨/길찾기 작업 (현장과 집 주소를 안 뒤 시작)
+
+    async def _record():
+        """사용자 확인 → 출근 기록 → 근무일수/출동 횟수 조회. 메시지 마감과 상관없이 끝까지 진행합니다."""
+        user_info, site_addresses = await asyncio.gather(user_task, site_task)
+
+        # Slack_ID로 못 찾으면 user_name(핸들)로 재시도
+        if not user_info and user_name:
+            user_info = await _run_blocking("google", sheets_handler.get_user_info, user_name)
+
+        # 시트 기록용 이름 (항상 한글 이름 사용을 시도, 없으면 핸들 → Slack 멘션)
+        if user_info and user_info.get("name"):
+            name_for_log = user_info["name"]
+        else:
+            name_for_log = user_name or f"<@{user_id}>"
+
+        # 출근 기록에는 첫 번째 주소만 사용 (기존 호환성 유지)
+        site_address = site_addresses[0] if site_addresses else SITE_ADDRESS
+        # 직원 집 주소 (소요시간 계산용)
+        home_address = user_info.get("address", "") if user_info else ""
+
+        # 날씨/길찾기는 출근 기록과 무관하므로 기록과 동시에 시작
+        enrich_tasks["weather"] = asyncio.ensure_future(_run_blocking(
+            "external", _get_weather_forecast, site_address,
+            timeout=CHECK_IN_CALL_TIMEOUT, default=(None, None, None),
+        ))
         # 카카오 길찾기 (집 → 현장 소요시간)
-        travel_future = executor.submit(_get_travel_time, home_address, site_address)
+        enrich_tasks["travel"] = asyncio.ensure_future(_run_blocking(
+            "external", _get_travel_time, home_address, site_address,
+            timeout=CHECK_IN_CALL_TIMEOUT, default={"error": "타임아웃"},
+        ))
+
+        # 출근 기록 (비고란에 현장 주소 포함) - 근무일수/출동 횟수 조회보다 반드시 먼저 실행
+        success, msg = await _run_blocking("google", sheets_handler.record_check_in, name_for_log, site_address)
+        if not success:
+            for task in enrich_tasks.values():
+                task.cancel()
+            return {"error": msg}
+        if idempotency_key:
+            local_store.complete_idempotency_key(idempotency_key)
+
+        # Phase 2: 출근 기록 후 근무일수/출동 횟수 조회 (메시지 필수 정보)
+        current_total_days, monthly_count = await asyncio.gather(
+            # 총 근무일수
+            _run_blocking("google", sheets_handler.get_total_work_days, name_for_log),
+            # 이번 달 근무 횟수
+            _run_blocking("google", sheets_handler.get_monthly_work_count, name_for_log, current_year, current_month),
+        )
+        return {
+            "name": name_for_log,
+            "site_addresses": site_addresses,
+            "site_address": site_address,
+            "total_days": current_total_days,
+            "monthly_count": monthly_count,
+        }
 
-        # 결과 수집
-        pop, pty, weather_error = weather_future.result()
-        current_total_days = total_days_future.result()
-        monthly_count = monthly_count_future.result()
-        travel_info = travel_future.result()
+    record_task = asyncio.ensure_future(_record())
+
+    # 출근 기록과 근무일수 조회는 마감 시각까지만 기다림
+    await asyncio.wait({record_task}, timeout=_remaining())
+    if record_task.done():
+        result = record_task.result()  # 예외는 그대로 올려 작업을 다시 시도하게 함
+        if "error" in result:
+            await _run_blocking(
+                "slack",
+                _send_slack,
+                channel_id,
+                f"❌ **출근 기록 실패:** {result['error']}",
+            )
+            return
+        # 날씨/길찾기도 남은 시간 안에서만 기다림
+        await asyncio.wait(set(enrich_tasks.values()), timeout=_remaining())
+    else:
+        # 기록이 늦어지면 캐시된 사용자 이름, 이미 끝난 캘린더 조회(없으면 기본 현장)로 먼저 보냄
+        cached_user = sheets_handler.peek_user_info(user_id) if user_id else None
+        if not cached_user and user_name:
+            cached_user = sheets_handler.peek_user_info(user_name)
+        site_addresses = site_task.result() if site_task.done() and not site_task.exception() else default_sites
+        result = {
+            "name": cached_user["name"] if cached_user and cached_user.get("name") else (user_name or f"<@{user_id}>"),
+            "site_addresses": site_addresses,
+            "site_address": site_addresses[0] if site_addresses else SITE_ADDRESS,
+            "total_days": None,
+            "monthly_count": None,
+        }
 
-    current_level = sheets_handler.calculate_level(current_total_days)
+    def _enrichment(info):
+        """지금까지 끝난 날씨/길찾기 결과. 늦어지면 같은 현장의 직전 예보 요약으로 대신합니다."""
+        weather_task = enrich_tasks.get("weather")
+        travel_task = enrich_tasks.get("travel")
+        if weather_task is not None and weather_task.done() and not weather_task.cancelled():
+            pop, pty, _ = weather_task.result()
+        else:
+            pop, pty = _last_weather_by_site.get(info["site_address"], (None, None))
+        if travel_task is not None and travel_task.done() and not travel_task.cancelled():
+            travel_info = travel_task.result()
+        else:
+            travel_info = {"error": "지연"}
+        return pop, pty, travel_info
 
-    # 출근 시에는 레벨업 체크를 하지 않음 (출근은 0.5일, 퇴근해야 1일 완성)
-    # 레벨업 및 각성 단계 체크는 퇴근 시에만 수행
+    def _compose_message(info, pop, pty, travel_info):
+        name_for_log = info["name"]
+        site_addresses = info["site_addresses"]
+        current_total_days = info["total_days"]
+        monthly_count = info["monthly_count"]
+        recorded = current_total_days is not None
 
-    # 새로운 정보 조회 (동기적으로 - 빠른 계산들)
-    awakening_emoji, awakening_num = sheets_handler.get_awakening_stage_with_number(current_total_days)
-    awakening_stage_text = f"{awakening_emoji} [각성 {awakening_num}단계]" if awakening_num > 0 else "🟤 [초보]"
-    user_title = sheets_handler.get_user_title(current_total_days)
-    days_until_settlement = sheets_handler.get_days_until_settlement()
+        # 출근 시에는 레벨업 체크를 하지 않음 (출근은 0.5일, 퇴근해야 1일 완성)
+        # 레벨업 및 각성 단계 체크는 퇴근 시에만 수행
+
+        # 새로운 정보 조회 (동기적으로 - 빠른 계산들)
+        days_until_settlement = sheets_handler.get_days_until_settlement()
     
-    # 메시지 구성 (새로운 형식)
-    parts = [
-        f"✅ [{name_for_log}님, 출근 기록 완료!]",
-        "오늘도 활기차게 시동 걸어볼까요? 🚛",
-        "",
-    ]
+        # 메시지 구성 (새로운 형식) - 기록이 끝나기 전에 보내는 메시지는 "기록 중"으로 표시
+        parts = [
+            f"✅ [{name_for_log}님, 출근 기록 완료!]" if recorded else f"⏳ [{name_for_log}님, 출근 기록 중...]",
+            "오늘도 활기차게 시동 걸어볼까요? 🚛",
+            "",
+        ]
     
-    # 날씨 정보 추가
-    if pop is not None and pop > 0:
-        weather_emoji = "☔️" if pty == "비" else "🌨️" if pty == "눈" else "🌦️"
-        parts.append(f"{weather_emoji} 오후 예보 (강수확률 {pop}%)")
-        if pty != "없음":
-            parts.append(f"💡 {pty} 올 수 있으니 조심하세요! 우산 챙기셨나요?")
+        # 날씨 정보 추가
+        if pop is not None and pop > 0:
+            weather_emoji = "☔️" if pty == "비" else "🌨️" if pty == "눈" else "🌦️"
+            parts.append(f"{weather_emoji} 오후 예보 (강수확률 {pop}%)")
+            if pty != "없음":
+                parts.append(f"💡 {pty} 올 수 있으니 조심하세요! 우산 챙기셨나요?")
+            else:
+                parts.append(f"💡 가볍게 스쳐갈 수 있어요. 우산 준비하세요!")
+        elif pop is not None and pop == 0:
+            parts.append("🌤️ 오후 날씨 맑음 예보")
+            parts.append("☀️ 좋은 날씨네요! 안전 운전하세요!")
         else:
-            parts.append(f"💡 가볍게 스쳐갈 수 있어요. 우산 준비하세요!")
-    elif pop is not None and pop == 0:
-        parts.append("🌤️ 오후 날씨 맑음 예보")
-        parts.append("☀️ 좋은 날씨네요! 안전 운전하세요!")
-    else:
-        # 날씨 정보를 가져오지 못한 경우
-        parts.append("🌤️ 날씨 정보 조회 중...")
+            # 날씨 정보를 가져오지 못한 경우
+            parts.append("🌤️ 날씨 정보 조회 중...")
+
+        # 소요시간 정보 추가 (카카오 길찾기)
+        if travel_info and not travel_info.get("error"):
+            duration = travel_info["duration"]
+            distance = travel_info["distance"]
+            arrival_time = (now + timedelta(minutes=duration)).strftime("%H:%M")
 
-    # 소요시간 정보 추가 (카카오 길찾기)
-    if travel_info and not travel_info.get("error"):
-        duration = travel_info["duration"]
-        distance = travel_info["distance"]
-        arrival_time = (now + timedelta(minutes=duration)).strftime("%H:%M")
+            parts.append("")
+            parts.append("🚗 현장까지 예상 소요시간")
+            parts.append(f" • 거리: {distance}km")
+            parts.append(f" • 소요: 약 {duration}분")
+            parts.append(f" • 예상 도착: {arrival_time}")
 
         parts.append("")
-        parts.append("🚗 현장까지 예상 소요시간")
-        parts.append(f" • 거리: {distance}km")
-        parts.append(f" • 소요: 약 {duration}분")
-        parts.append(f" • 예상 도착: {arrival_time}")
-
-    parts.append("")
-    parts.append("──────────────")
-    parts.append("")
-
-    # 현장 주소 (여러 개인 경우 각각 표시)
-    if site_addresses:
-        if len(site_addresses) == 1:
-            parts.append("📍 오늘의 현장")
-            parts.append(f":: {site_addresses[0]}")
-        else:
-            for idx, addr in enumerate(site_addresses, 1):
-                if idx == 1:
-                    parts.append("📍 첫번째 현장")
-                elif idx == 2:
-                    parts.append("📍 두번째 현장")
-                else:
-                    parts.append(f"📍 {idx}번째 현장")
-                parts.append(f":: {addr}")
+        parts.append("──────────────")
         parts.append("")
-    
-    parts.append("──────────────")
-    parts.append("")
-    parts.append(f"📊 {current_month}월의 기록")
-    parts.append(f" • 현황: {monthly_count}번째 출동 | 정산일 D-{days_until_settlement}")
-    parts.append(f" • 등급: {awakening_stage_text} (Lv.{current_level})")
-    parts.append(f" • 칭호: {user_title}")
-    parts.append("")
-    parts.append("──────────────")
-    parts.append("")
-    parts.append('"오늘도 안전하게, 돈 많이 벌어오세요! 출발! 💸"')
-
-    _send_slack_with_tmap(channel_id, "\n".join(parts), site_addresses)
 
+        # 현장 주소 (여러 개인 경우 각각 표시)
+        if site_addresses:
+            if len(site_addresses) == 1:
+                parts.append("📍 오늘의 현장")
+                parts.append(f":: {site_addresses[0]}")
+            else:
+                for idx, addr in enumerate(site_addresses, 1):
+                    if idx == 1:
+                        parts.append("📍 첫번째 현장")
+                    elif idx == 2:
+                        parts.append("📍 두번째 현장")
+                    else:
+                        parts.append(f"📍 {idx}번째 현장")
+                    parts.append(f":: {addr}")
+            parts.append("")
+    
+        parts.append("──────────────")
+        parts.append("")
+        parts.append(f"📊 {current_month}월의 기록")
+        if recorded:
+            current_level = sheets_handler.calculate_level(current_total_days)
+            awakening_emoji, awakening_num = sheets_handler.get_awakening_stage_with_number(current_total_days)
+            awakening_stage_text = f"{awakening_emoji} [각성 {awakening_num}단계]" if awakening_num > 0 else "🟤 [초보]"
+            user_title = sheets_handler.get_user_title(current_total_days)
+            parts.append(f" • 현황: {monthly_count}번째 출동 | 정산일 D-{days_until_settlement}")
+            parts.append(f" • 등급: {awakening_stage_text} (Lv.{current_level})")
+            parts.append(f" • 칭호: {user_title}")
+        else:
+            parts.append(f" • 현황: 집계 중... | 정산일 D-{days_until_settlement}")
+        parts.append("")
+        parts.append("──────────────")
+        parts.append("")
+        parts.append('"오늘도 안전하게, 돈 많이 벌어오세요! 출발! 💸"')
+        return "\n".join(parts)
+
+    pop, pty, travel_info = _enrichment(result)
+    text = _compose_message(result, pop, pty, travel_info)
+    sent = await _run_blocking(
+        "slack", _send_slack_with_tmap, channel_id, text, result["site_addresses"],
+        timeout=CHECK_IN_CALL_TIMEOUT,
+    )
 
-def _handle_check_out(user_id: str, user_name: str, channel_id: str):
+    # 마감 뒤에 끝난 출근 기록/근무일수 조회 결과를 반영
+    if not record_task.done():
+        try:
+            result = await record_task
+        except Exception:
+            if sent:
+                await _run_blocking(
+                    "slack", _update_slack, sent[0], sent[1],
+                    "❌ **출근 기록 실패:** 잠시 후 자동으로 다시 시도합니다.",
+                )
+            raise
+        if "error" in result:
+            failure_text = f"❌ **출근 기록 실패:** {result['error']}"
+            if sent:
+                await _run_blocking("slack", _update_slack, sent[0], sent[1], failure_text)
+            else:
+                await _run_blocking("slack", _send_slack, channel_id, failure_text)
+            return
+
+    # 늦게 도착한 날씨/길찾기 결과도 기다렸다가 반영 (각 호출은 CHECK_IN_CALL_TIMEOUT 제한이 있음)
+    late_tasks = {task for task in enrich_tasks.values() if not task.done()}
+    if late_tasks:
+        await asyncio.wait(late_tasks)
+
+    final_pop, final_pty, final_travel = _enrichment(result)
+    if final_pop is None:
+        # 늦게 온 예보도 실패했으면 먼저 보낸 값을 유지
+        final_pop, final_pty = pop, pty
+    final_text = _compose_message(result, final_pop, final_pty, final_travel)
+    if not sent:
+        # 먼저 보낸 메시지가 없으면(전송 실패/생략) 완성된 메시지를 새로 보냄
+        await _run_blocking("slack", _send_slack_with_tmap, channel_id, final_text, result["site_addresses"])
+    elif final_text != text:
+        await _run_blocking("slack", _update_slack_with_tmap, sent[0], sent[1], final_text, result["site_addresses"])
+
+
+def _handle_check_out(user_id: str, user_name: str, channel_id: str, idempotency_key: str = None):
     """실제 퇴근 기록 및 게임화 메시지 전송."""
     # Slack_ID (user_id)를 우선 사용하여 UserMaster 조회
     user_info = sheets_handler.get_user_info(user_id) if user_id else None
@@ -635,27 +1183,40 @@ def _handle_check_out(user_id: str, user_name: str, channel_id: str):
         user_info = sheets_handler.get_user_info(user_name)
     name_for_log = user_info["name"] if user_info else user_name
 
-    prev_total_days = sheets_handler.get_total_work_days(name_for_log)
-    
     # 주소 정보는 나중에 사용하므로 user_info 유지
 
-    success, msg = sheets_handler.record_check_out(name_for_log)
-    if not success:
-        _send_slack(
-            channel_id,
-            f"❌ **퇴근 기록 실패:** {msg}",
-        )
-        return
+    # 퇴근 기록은 단계 키로 한 번만 남김 (근무일수 증가 실패로 다시 시도될 때 중복 기록 방지)
+    log_key = f"{idempotency_key}:log" if idempotency_key else None
+    log_state = local_store.get_idempotency_key(log_key) if log_key else None
+    if log_state is None or log_state[0] != "done":
+        success, msg = sheets_handler.record_check_out(name_for_log)
+        if not success:
+            _send_slack(
+                channel_id,
+                f"❌ **퇴근 기록 실패:** {msg}",
+            )
+            return
+        if log_key and local_store.claim_idempotency_key(log_key):
+            local_store.complete_idempotency_key(log_key)
 
     now = datetime.now(sheets_handler.KST)
     current_year = now.year
     current_month = now.month
 
-    # 퇴근 기록 후 누적근무일수 +1 증가
-    current_total_days = sheets_handler.get_total_work_days(name_for_log)
-    new_total_days = current_total_days + 1
-    sheets_handler.update_user_base_work_days(name_for_log, new_total_days)
-    current_total_days = new_total_days  # 이후 로직에서 증가된 값 사용
+    # 퇴근 기록 후 누적근무일수 +1 증가 (시트 값 기준으로 한 번만 씀)
+    incremented = sheets_handler.increment_user_base_work_days(name_for_log)
+    if not incremented and user_info:
+        # 등록된 사용자인데 증가에 실패하면 키를 완료하지 않고 작업을 다시 시도하게 함
+        raise RuntimeError(f"{name_for_log} 누적근무일수 증가 실패")
+    # 퇴근 기록과 근무일수 증가가 모두 끝난 뒤에만 완료 처리
+    if idempotency_key:
+        local_store.complete_idempotency_key(idempotency_key)
+    if incremented:
+        prev_total_days, current_total_days = incremented
+    else:
+        # UserMaster에 없는 사용자는 증가할 행이 없으므로 조회 값 기준으로 계산
+        prev_total_days = sheets_handler.get_total_work_days(name_for_log)
+        current_total_days = prev_total_days + 1
 
     # 퇴근 시 레벨업 및 각성 단계 체크 (퇴근해야 1일 완성)
     level_up, new_level, old_level = sheets_handler.check_level_up(current_total_days, prev_total_days)
@@ -733,6 +1294,18 @@ def _send_slack(channel: str, text: str):
         logging.exception("Failed to send Slack message to %s: %s", channel, e)
 
 
+def _send_slack_ephemeral(channel: str, user: str, text: str):
+    """채널의 특정 사용자에게만 보이는 슬랙 메시지 전송."""
+    if not slack_client:
+        logging.warning("SLACK_BOT_TOKEN not set; skip sending Slack ephemeral message")
+        return
+    try:
+        slack_client.chat_postEphemeral(channel=channel, user=user, text=text)
+        logging.info("Slack ephemeral message sent to %s in %s", user, channel)
+    except Exception as e:
+        logging.exception("Failed to send Slack ephemeral message to %s: %s", user, e)
+
+
 def _send_slack_with_buttons(channel: str, text: str, home_address: str = None):
     """버튼이 포함된 슬랙 메시지 전송 (퇴근 메시지용).
     
@@ -796,107 +1369,144 @@ def _send_slack_with_buttons(channel: str, text: str, home_address: str = None):
         logging.exception("Failed to send Slack message with buttons to %s: %s", channel, e)
 
 
-def _send_slack_with_tmap(channel: str, text: str, site_addresses=None):
-    """T-map 버튼이 포함된 슬랙 메시지 전송 (출근 메시지용).
+def _build_tmap_blocks(text: str, site_addresses=None) -> list:
+    """출근 메시지용 Block Kit 구성 (T-map 버튼, 자재사용등록 버튼 포함)."""
+    # 현장 주소 결정
+    if site_addresses is None:
+        addresses = [SITE_ADDRESS] if SITE_ADDRESS else []
+    elif isinstance(site_addresses, str):
+        # 기존 호환성을 위해 문자열도 리스트로 변환
+        addresses = [site_addresses] if site_addresses.strip() else []
+    else:
+        addresses = [addr.strip() for addr in site_addresses if addr and addr.strip()]
     
-    Args:
-        channel: Slack 채널 ID
-        text: 메시지 텍스트
-        site_addresses: 현장 주소 리스트 (없으면 SITE_ADDRESS 환경 변수 사용)
-    """
-    if not slack_client:
-        logging.warning("SLACK_BOT_TOKEN not set; skip sending Slack message")
-        return
+    # Block Kit으로 메시지 구성
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": text
+            }
+        }
+    ]
     
-    try:
-        # 현장 주소 결정
-        if site_addresses is None:
-            addresses = [SITE_ADDRESS] if SITE_ADDRESS else []
-        elif isinstance(site_addresses, str):
-            # 기존 호환성을 위해 문자열도 리스트로 변환
-            addresses = [site_addresses] if site_addresses.strip() else []
+    # T-map 버튼 추가
+    buttons = []
+    if len(addresses) == 1:
+        # 현장이 1개인 경우
+        encoded_address = quote(addresses[0])
+        if RENDER_SERVICE_URL:
+            # Render를 거쳐서 리다이렉트
+            tmap_button_url = f"{OPEN_TMAP_BASE_URL}?addr={encoded_address}"
         else:
-            addresses = [addr.strip() for addr in site_addresses if addr and addr.strip()]
-        
-        # Block Kit으로 메시지 구성
-        blocks = [
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": text
-                }
-            }
-        ]
-        
-        # T-map 버튼 추가
-        buttons = []
-        if len(addresses) == 1:
-            # 현장이 1개인 경우
-            encoded_address = quote(addresses[0])
+            # T-map 웹 URL 직접 사용
+            tmap_button_url = f"{OPEN_TMAP_BASE_URL}?q={encoded_address}"
+        buttons.append({
+            "type": "button",
+            "text": {
+                "type": "plain_text",
+                "text": "🚩 오늘 현장 T-map 열기"
+            },
+            "url": tmap_button_url,
+            "style": "primary"
+        })
+    elif len(addresses) >= 2:
+        # 현장이 2개 이상인 경우
+        for idx, address in enumerate(addresses[:2], 1):  # 최대 2개만
+            encoded_address = quote(address)
             if RENDER_SERVICE_URL:
                 # Render를 거쳐서 리다이렉트
                 tmap_button_url = f"{OPEN_TMAP_BASE_URL}?addr={encoded_address}"
             else:
                 # T-map 웹 URL 직접 사용
                 tmap_button_url = f"{OPEN_TMAP_BASE_URL}?q={encoded_address}"
+            if idx == 1:
+                button_text = "🚩 첫번째 현장 T-map 열기"
+            else:
+                button_text = "🚩 두번째 현장 T-map 열기"
             buttons.append({
                 "type": "button",
                 "text": {
                     "type": "plain_text",
-                    "text": "🚩 오늘 현장 T-map 열기"
+                    "text": button_text
                 },
                 "url": tmap_button_url,
                 "style": "primary"
             })
-        elif len(addresses) >= 2:
-            # 현장이 2개 이상인 경우
-            for idx, address in enumerate(addresses[:2], 1):  # 최대 2개만
-                encoded_address = quote(address)
-                if RENDER_SERVICE_URL:
-                    # Render를 거쳐서 리다이렉트
-                    tmap_button_url = f"{OPEN_TMAP_BASE_URL}?addr={encoded_address}"
-                else:
-                    # T-map 웹 URL 직접 사용
-                    tmap_button_url = f"{OPEN_TMAP_BASE_URL}?q={encoded_address}"
-                if idx == 1:
-                    button_text = "🚩 첫번째 현장 T-map 열기"
-                else:
-                    button_text = "🚩 두번째 현장 T-map 열기"
-                buttons.append({
-                    "type": "button",
-                    "text": {
-                        "type": "plain_text",
-                        "text": button_text
-                    },
-                    "url": tmap_button_url,
-                    "style": "primary"
-                })
-        
-        # 자재사용대장 버튼 추가
-        buttons.append({
-            "type": "button",
-            "text": {
-                "type": "plain_text",
-                "text": "📋 자재사용등록[퇴근]"
-            },
-            "action_id": "open_material_log"
+    
+    # 자재사용대장 버튼 추가
+    buttons.append({
+        "type": "button",
+        "text": {
+            "type": "plain_text",
+            "text": "📋 자재사용등록[퇴근]"
+        },
+        "action_id": "open_material_log"
+    })
+
+    if buttons:
+        blocks.append({
+            "type": "actions",
+            "elements": buttons
         })
 
-        if buttons:
-            blocks.append({
-                "type": "actions",
-                "elements": buttons
-            })
-        
+    return blocks
+
+
+def _send_slack_with_tmap(channel: str, text: str, site_addresses=None):
+    """T-map 버튼이 포함된 슬랙 메시지 전송 (출근 메시지용).
+    
+    Args:
+        channel: Slack 채널 ID
+        text: 메시지 텍스트
+        site_addresses: 현장 주소 리스트 (없으면 SITE_ADDRESS 환경 변수 사용)
+
+    Returns:
+        tuple: 나중에 메시지를 수정할 때 쓸 (채널 ID, ts). 실패 시 None
+    """
+    if not slack_client:
+        logging.warning("SLACK_BOT_TOKEN not set; skip sending Slack message")
+        return None
+    
+    try:
         # WebClient를 사용하여 메시지 전송
-        slack_client.chat_postMessage(
+        response = slack_client.chat_postMessage(
             channel=channel,
             text=text,
-            blocks=blocks
+            blocks=_build_tmap_blocks(text, site_addresses)
         )
         logging.info("Slack message with T-map button(s) sent to %s", channel)
+        return response["channel"], response["ts"]
     except Exception as e:
         logging.exception("Failed to send Slack message with T-map to %s: %s", channel, e)
+        return None
+
+
+def _update_slack(channel: str, ts: str, text: str):
+    """이미 보낸 메시지를 버튼 없는 텍스트로 수정합니다 (chat_update)."""
+    if not slack_client:
+        return
+    try:
+        slack_client.chat_update(channel=channel, ts=ts, text=text, blocks=[])
+        logging.info("Slack message updated in %s (ts=%s)", channel, ts)
+    except Exception as e:
+        logging.exception("Failed to update Slack message in %s: %s", channel, e)
+
+
+def _update_slack_with_tmap(channel: str, ts: str, text: str, site_addresses=None):
+    """이미 보낸 출근 메시지를 새 내용으로 수정합니다 (chat_update)."""
+    if not slack_client:
+        return
+    try:
+        slack_client.chat_update(
+            channel=channel,
+            ts=ts,
+            text=text,
+            blocks=_build_tmap_blocks(text, site_addresses)
+        )
+        logging.info("Slack message updated in %s (ts=%s)", channel, ts)
+    except Exception as e:
+        logging.exception("Failed to update Slack message in %s: %s", channel, e)
 
 